@@ -1,6 +1,6 @@
 # evidence/assessor.py
 from __future__ import annotations
-from typing import List, Literal, Dict, Any
+from typing import List, Literal, Dict, Any, Optional
 
 from .models import EvidenceAssessment
 from .heuristics import (
@@ -14,6 +14,10 @@ COVERAGE_THRESHOLD = 0.50
 MIN_SIM_THRESHOLD = 0.50
 
 class EvidenceAssessor:
+    def __init__(self, chunk_features: Optional[Dict[str, Any]] = None):
+        # Index-time chunk features of the retrieval corpus (looked up by chunk_id)
+        self.chunk_features = chunk_features
+
     def assess_evidence(
         self,
         query: str,
@@ -34,7 +38,7 @@ class EvidenceAssessor:
 
         max_similarity = evaluate_max_similarity(retrieved_chunks)
         evidence_present = evaluate_evidence_presence(retrieved_chunks, min_sim_threshold=MIN_SIM_THRESHOLD)
-        coverage_score = evaluate_coverage(retrieved_chunks, query)
+        coverage_score = evaluate_coverage(retrieved_chunks, query, chunk_features=self.chunk_features)
         conflicting_sources = detect_conflicts(retrieved_chunks)
 
         if not evidence_present:
@@ -1,25 +1,8 @@
 # evidence/heuristics.py
 from __future__ import annotations
-import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-_TOKEN_RE = re.compile(r"[a-z0-9]+")
-
-_STOPWORDS = {
-    "the","a","an","and","or","but","if","then","else","for","to","of","in","on","at","by",
-    "with","as","is","are","was","were","be","been","being","it","this","that","these","those",
-    "you","your","we","our","they","their","i","me","my","from","into","over","under","after",
-    "before","during","about","between","within","without","not","no","can","could","should",
-    "would","may","might","must","will","do","does","did"
-}
-
-def _tokenize(text: str) -> List[str]:
-    if not isinstance(text, str):
-        return []
-    return _TOKEN_RE.findall(text.lower())
-
-def _non_stop_tokens(text: str) -> List[str]:
-    return [t for t in _tokenize(text) if t not in _STOPWORDS]
+from tools.analyzer import non_stop_tokens, tokenize
 
 def chunk_score(chunk: Dict[str, Any]) -> float:
     """
@@ -51,14 +34,27 @@ def evaluate_max_similarity(chunks: List[Dict[str, Any]]) -> float:
 
 def _key_terms(query: str, top_n: int = 6) -> List[str]:
     # Deterministic "key terms": unique non-stop tokens, longest first (stable tie-break)
-    toks = list(dict.fromkeys(_non_stop_tokens(query)))
+    toks = list(dict.fromkeys(non_stop_tokens(query)))
     toks.sort(key=lambda t: (-len(t), t))
     return toks[:top_n]
 
-def evaluate_coverage(chunks: List[Dict[str, Any]], query: str, top_n: int = 6) -> float:
+def _feature_row(chunk: Dict[str, Any], chunk_features: Optional[Dict[str, Any]]) -> Optional[int]:
+    if chunk_features is None:
+        return None
+    return chunk_features["rows"].get(chunk.get("chunk_id"))
+
+def evaluate_coverage(
+    chunks: List[Dict[str, Any]],
+    query: str,
+    top_n: int = 6,
+    chunk_features: Optional[Dict[str, Any]] = None,
+) -> float:
     """
     Coverage = fraction of top query key-terms that appear in at least one chunk.
     This is NOT "support", but it blocks "topic-only" retrieval from green-lighting generation.
+
+    chunk_features: optional index-time table (tools.reranker_core.create_chunk_features);
+    chunks found in it by chunk_id use their stored token ids instead of re-tokenising.
     """
     keys = _key_terms(query, top_n=top_n)
     if not keys:
@@ -66,8 +62,18 @@ def evaluate_coverage(chunks: List[Dict[str, Any]], query: str, top_n: int = 6)
 
     covered = set()
     for c in chunks:
+        row = _feature_row(c, chunk_features)
+        if row is not None:
+            offsets = chunk_features["tok_offsets"]
+            ids = set(chunk_features["tok_ids"][offsets[row]:offsets[row + 1]].tolist())
+            token_ids = chunk_features["token_ids"]
+            for k in keys:
+                if token_ids.get(k) in ids:
+                    covered.add(k)
+            continue
+
         text = c.get("text", "") or ""
-        cset = set(_tokenize(text))
+        cset = set(tokenize(text))
         for k in keys:
             if k in cset:
                 covered.add(k)
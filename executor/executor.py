@@ -1,6 +1,7 @@
 # executor/executor.py
 from tools.retrieve_tool import retrieve_tool
 from tools.noop import noop_tool
+from utils.timing import span
 
 class Executor:
     def execute(self, plan, wm=None):
@@ -19,7 +20,8 @@ class Executor:
             if not tool_fn:
                 raise ValueError(f"Unknown action: {step.action}")
 
-            result = tool_fn(**step.args)
+            with span(step.action):
+                result = tool_fn(**step.args)
 
             if wm is not None:
                 wm.thoughts.append(
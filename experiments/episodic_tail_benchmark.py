@@ -0,0 +1,111 @@
+# experiments/episodic_tail_benchmark.py
+"""
+EpisodicStore.tail latency as the episodic log grows.
+
+  baseline: readlines() over the whole file, then slice (the old tail)
+  tail:     EpisodicStore.tail (blocks read backwards from the end)
+
+  python -m experiments.episodic_tail_benchmark [max_records]
+
+Logs of 10^3 .. max_records (default 10^6) realistic episode records are
+written to a temporary directory. The baseline is skipped above
+BASELINE_MAX_RECORDS because it is linear in the file size; where both
+run, their results are checked to be identical.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from memory.episodic import EpisodicStore
+
+TAIL_N = 10  # what Runtime.run asks for
+REPEATS = 50
+BASELINE_MAX_RECORDS = 100_000
+
+RECORD = {
+    "ts_utc": 1760000000.0,
+    "question": "What BLEU score did the Transformer achieve on WMT 2014 English-to-German?",
+    "plan_actions": ["retrieve"],
+    "used_retrieval": True,
+    "last_user_question_before_run": "What is parametric memory according to RAG?",
+    "recent_episode_count_before_run": 10,
+    "event": "evidence_assessment",
+    "executor_decision": "retrieve",
+    "evidence_assessment": {
+        "evidence_present": True,
+        "sufficiency": "insufficient",
+        "max_similarity": 0.5535807068208103,
+        "coverage_score": 0.3333333333333333,
+        "conflicting_sources": False,
+        "rationale": "Low key-term coverage (0.33 < 0.5).",
+    },
+    "generation_policy_decision": "refuse",
+    "produced_text": True,
+}
+
+
+def baseline_tail(path: str, n: int):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+    out = []
+    for ln in lines[-n:]:
+        try:
+            out.append(json.loads(ln))
+        except Exception:
+            continue
+    return out
+
+
+def grow_log(path: str, total: int, have: int) -> None:
+    """Append records until the log holds `total` of them."""
+    with open(path, "a", encoding="utf-8") as f:
+        batch = []
+        for i in range(have, total):
+            batch.append(json.dumps({**RECORD, "ts_utc": RECORD["ts_utc"] + i}) + "\n")
+            if len(batch) == 10_000:
+                f.write("".join(batch))
+                batch.clear()
+        f.write("".join(batch))
+
+
+def bench(fn, repeats: int = REPEATS) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    max_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [s for s in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if s <= max_records]
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, "episodic.jsonl")
+    store = EpisodicStore(path)
+    have = 0
+    try:
+        print(f"tail(n={TAIL_N}), mean of {REPEATS} calls")
+        print(f"{'records':>10} {'file MB':>9} {'baseline ms':>12} {'tail ms':>9} {'speedup':>9}")
+        for size in sizes:
+            grow_log(path, size, have)
+            have = size
+            mb = os.path.getsize(path) / 1e6
+
+            t_new = bench(lambda: store.tail(n=TAIL_N))
+            if size <= BASELINE_MAX_RECORDS:
+                assert store.tail(n=TAIL_N) == baseline_tail(path, TAIL_N), "output mismatch"
+                t_old = bench(lambda: baseline_tail(path, TAIL_N), repeats=max(REPEATS // 10, 1))
+                old_col, speedup = f"{t_old * 1e3:>12.3f}", f"{t_old / t_new:>8.0f}x"
+            else:
+                old_col, speedup = f"{'skipped':>12}", f"{'':>9}"
+
+            print(f"{size:>10} {mb:>9.1f} {old_col} {t_new * 1e3:>9.3f} {speedup}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# experiments/text_cache_check.py
+"""
+Regression check: a PDF whose chunking stops early (max_chunks reached
+before the end of the document) must still get a complete text cache entry.
+
+    python -m experiments.text_cache_check
+"""
+import os
+import tempfile
+
+from tools.corpus import _extract_chunks
+from tools.ingest import EXTRACTION_VERSION, _iter_extracted_pages, iter_chunks, iter_pdf_text
+from tools.text_cache import TextCache
+
+PDF_DIR = "data/input_pdfs/"
+MAX_CHUNKS = 2
+
+
+def check_pdf(pdf_path: str, cache_dir: str) -> None:
+    cache = TextCache(cache_dir)
+    text = iter_pdf_text(pdf_path, cache=cache)
+    try:
+        chunks = list(iter_chunks(text, strategy="fixed", max_chunks=MAX_CHUNKS))
+    finally:
+        text.close()
+    assert len(chunks) == MAX_CHUNKS, f"{pdf_path}: has fewer than {MAX_CHUNKS + 1} chunks"
+
+    cached = cache.get(pdf_path, EXTRACTION_VERSION)
+    assert cached is not None, f"{pdf_path}: no cache entry after an early stop"
+    assert cached == list(_iter_extracted_pages(pdf_path)), f"{pdf_path}: cache entry is incomplete"
+
+    # The corpus build path, from the cache this time
+    assert _extract_chunks(pdf_path, "fixed", cache) == _extract_chunks(pdf_path, "fixed", None)
+
+
+def main():
+    for filename in sorted(os.listdir(PDF_DIR)):
+        if not filename.endswith(".pdf"):
+            continue
+        with tempfile.TemporaryDirectory() as cache_dir:
+            check_pdf(os.path.join(PDF_DIR, filename), cache_dir)
+        print(f"ok  {filename}")
+
+
+if __name__ == "__main__":
+    main()
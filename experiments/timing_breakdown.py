@@ -0,0 +1,37 @@
+# experiments/timing_breakdown.py
+"""
+Per-stage latency breakdown over runtime traces.
+
+  python -m experiments.timing_breakdown [logs/traces.jsonl]
+
+Reads the `timings` span tree of every trace, rotated segments included
+(traces written without timings are skipped), and prints one row per span
+path.
+"""
+import sys
+
+from utils.logging_utils import LOG_PATH, iter_traces
+from utils.timing import aggregate_timings
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else LOG_PATH
+    stages = aggregate_timings(iter_traces(path))
+    if not stages:
+        print(f"No traces with timings in {path}")
+        return
+
+    n = next(iter(stages.values()))["traces"]
+    print(f"{n} traces from {path}")
+    print(f"{'stage':<58} {'n':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'cpu ms':>9} {'share':>7}")
+    for path_, s in stages.items():
+        depth = path_.count("/")
+        label = "  " * depth + path_.rsplit("/", 1)[-1]
+        print(
+            f"{label:<58} {s['count']:>5} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} "
+            f"{s['p95_ms']:>9.3f} {s['cpu_mean_ms']:>9.3f} {s['share']:>6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# experiments/trace_resolve_check.py
+"""
+Check: compact traces stay resolvable after their corpus is rebuilt, and
+resolve to null text (not an error) once the build's chunk table is gone.
+
+    python -m experiments.trace_resolve_check
+"""
+import json
+import os
+import shutil
+import tempfile
+
+from tools.corpus import _open_or_build_corpus
+from tools.corpus_snapshot import RETIRED_DIR
+from tools.trace.compact import ChunkResolver, compact_trace, resolve_trace
+
+PDF_DIR = "data/input_pdfs/"
+N_CHUNKS = 4
+
+
+def fake_trace(corpus):
+    """A runtime trace whose retrieve step returned the corpus's first chunks."""
+    store = corpus["vector_store"]
+    chunks = [
+        {"chunk_id": cid, "text": text, "score": 1.0, "source": doc_id}
+        for cid, doc_id, text in list(zip(store.chunk_ids, store.doc_ids, store.texts))[:N_CHUNKS]
+    ]
+    result = {"k": N_CHUNKS, "corpus_fingerprint": corpus["fingerprint"], "chunks": chunks}
+    return {"question": "q", "execution": [{"step_id": 1, "action": "retrieve", "tool_result": result}]}
+
+
+def main():
+    work = tempfile.mkdtemp()
+    try:
+        pdf_dir = os.path.join(work, "pdfs")
+        root = os.path.join(work, "snapshots")
+        shutil.copytree(PDF_DIR, pdf_dir)
+
+        trace = fake_trace(_open_or_build_corpus(pdf_dir, "fixed", 1000, snapshot_root=root, text_cache=None))
+        compact = compact_trace(trace)
+        size, compact_size = len(json.dumps(trace)), len(json.dumps(compact))
+        print(f"trace {size} B, compact {compact_size} B ({size / compact_size:.1f}x)")
+
+        def resolved_chunks():
+            return resolve_trace(compact, ChunkResolver(root))["execution"][0]["tool_result"]["chunks"]
+
+        assert resolved_chunks() == trace["execution"][0]["tool_result"]["chunks"]
+        print("ok  resolves from the live snapshot")
+
+        # Change the sources: the rebuild replaces the snapshot the trace refers to
+        os.remove(os.path.join(pdf_dir, sorted(os.listdir(pdf_dir))[-1]))
+        rebuilt = _open_or_build_corpus(pdf_dir, "fixed", 1000, snapshot_root=root, text_cache=None)
+        assert rebuilt["fingerprint"] != trace["execution"][0]["tool_result"]["corpus_fingerprint"]
+        assert resolved_chunks() == trace["execution"][0]["tool_result"]["chunks"]
+        print("ok  resolves after a rebuild (retired chunk table)")
+
+        # Failure mode: no chunk table left for that build
+        shutil.rmtree(os.path.join(root, RETIRED_DIR))
+        chunks = resolved_chunks()
+        assert all(c["text"] is None and c["source"] is None for c in chunks)
+        assert [c["chunk_id"] for c in chunks] == [c["chunk_id"] for c in compact["execution"][0]["tool_result"]["chunks"]]
+        print("ok  resolves to null text once the chunk table is deleted")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
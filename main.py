@@ -1,14 +1,67 @@
 # main.py
+import argparse
+
 from runtime.run import Runtime
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Answer one question, or serve many from one runtime.")
+    parser.add_argument(
+        "--serve",
+        choices=["stdin", "http"],
+        default=None,
+        help="stdin: JSONL requests on stdin; http: local HTTP endpoint (POST /ask)",
+    )
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--no-preload", action="store_true", help="build the corpus on the first retrieve instead of at startup")
+    parser.add_argument("--profile-every", type=int, default=0, help="cProfile + tracemalloc every N-th request (logs/profiles/)")
+    parser.add_argument("--compact-traces", action="store_true", help="log retrieved chunks by id, not text (tools/trace/compact.py resolves them)")
+    parser.add_argument("--corpus-budget-mb", type=float, default=None, help="byte budget for corpora cached in this process (LRU eviction)")
+    parser.add_argument("--ingest-workers", type=int, default=1, help="processes used to ingest PDFs when the corpus is (re)built")
+    parser.add_argument("--query-cache-size", type=int, default=None, help="retrieve results cached in memory (0 disables the result cache)")
+    parser.add_argument("--query-cache-ttl", type=float, default=None, help="seconds a cached retrieve result stays valid")
+    parser.add_argument("--query-cache-disk", action="store_true", help="also cache retrieve results on disk (artifacts/query_cache/), shared across processes")
+    args = parser.parse_args()
+    if args.corpus_budget_mb is not None:
+        from tools.corpus import CORPUS_MANAGER
+
+        CORPUS_MANAGER.set_budget(int(args.corpus_budget_mb * 1024 * 1024))
+    if args.ingest_workers > 1:
+        from tools.retrieve_tool import set_ingest_workers
+
+        set_ingest_workers(args.ingest_workers)
+    if args.query_cache_size is not None or args.query_cache_ttl is not None or args.query_cache_disk:
+        from tools.query_cache import QUERY_CACHE_DIR, QueryCache
+        from tools.retrieve_tool import set_query_cache
+
+        if args.query_cache_size == 0:
+            set_query_cache(None)
+        else:
+            options = {"max_entries": args.query_cache_size} if args.query_cache_size is not None else {}
+            set_query_cache(QueryCache(
+                ttl_s=args.query_cache_ttl,
+                disk_dir=QUERY_CACHE_DIR if args.query_cache_disk else None,
+                **options,
+            ))
+    trace_mode = "compact" if args.compact_traces else "full"
+
+    if args.serve:
+        from runtime.serve import DEFAULT_HOST, DEFAULT_PORT, serve_http, serve_stdin
+
+        runtime = Runtime(preload=not args.no_preload, profile_every=args.profile_every, trace_mode=trace_mode)
+        if args.serve == "stdin":
+            serve_stdin(runtime)
+        else:
+            serve_http(runtime, host=args.host or DEFAULT_HOST, port=args.port or DEFAULT_PORT)
+        return
+
     question = input("Question: ").strip()
     if not question:
         print("No question provided.")
         return
 
-    runtime = Runtime()
+    runtime = Runtime(profile_every=args.profile_every, trace_mode=trace_mode)
     answer = runtime.run(question, k=4)
 
     print("\n--- ANSWER ---\n")
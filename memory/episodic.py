@@ -1,9 +1,12 @@
 # memory/episodic.py
 
 import os
+import re
 import json
 from typing import Any, Dict, List
 
+from utils.file_lock import locked_append
+
 class EpisodicStore:
     """
     Append-only event memory. Decay policy can be added later via policies/.
@@ -13,19 +16,62 @@ class EpisodicStore:
         os.makedirs(os.path.dirname(path), exist_ok=True)
 
     def append(self, record: Dict[str, Any]) -> None:
-        with open(self.path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Locked so concurrent workers never interleave partial lines
+        locked_append(self.path, json.dumps(record, ensure_ascii=False) + "\n")
 
     def tail(self, n: int = 50) -> List[Dict[str, Any]]:
         if not os.path.exists(self.path):
             return []
-        # Simple tail: read all then slice
-        with open(self.path, "r", encoding="utf-8") as f:
-            lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+        # Last n non-blank lines, read backwards from the end of the file
+        lines = tail_lines(self.path, n)
         out = []
-        for ln in lines[-n:]:
+        for ln in lines:
             try:
                 out.append(json.loads(ln))
             except Exception:
                 continue
-        return out
\ No newline at end of file
+        return out
+
+
+# Text-mode readlines() splits on universal newlines
+_NEWLINE_RE = re.compile(rb"\r\n|\r|\n")
+
+TAIL_BLOCK_SIZE = 8 * 1024
+TAIL_MAX_BLOCK_SIZE = 1024 * 1024
+
+
+def tail_lines(path: str, n: int, block_size: int = TAIL_BLOCK_SIZE) -> List[str]:
+    """
+    The last `n` non-blank lines of a UTF-8 file, stripped, oldest first.
+
+    Reads blocks backwards from the end (doubling in size, up to
+    TAIL_MAX_BLOCK_SIZE) and stops as soon as n complete lines are known,
+    so the cost depends on the size of those lines, not of the file. Same result as
+    `[ln.strip() for ln in f.readlines() if ln.strip()][-n:]` (including
+    n <= 0, which needs the whole file).
+    """
+    limit = n if n > 0 else None
+    found: List[str] = []  # newest first
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        rest = b""  # bytes before the earliest newline seen so far
+        while pos > 0 and (limit is None or len(found) < limit):
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            parts = _NEWLINE_RE.split(f.read(size) + rest)
+            # parts[0] may continue in the previous block (or be cut inside "\r\n";
+            # the empty line that leaves behind is blank and skipped)
+            rest = parts[0]
+            for raw in reversed(parts[1:]):
+                line = raw.decode("utf-8").strip()
+                if line:
+                    found.append(line)
+            block_size = min(block_size * 2, max(TAIL_MAX_BLOCK_SIZE, block_size))
+        if pos == 0 and (limit is None or len(found) < limit):
+            line = rest.decode("utf-8").strip()
+            if line:
+                found.append(line)
+
+    found.reverse()
+    return found[-n:]
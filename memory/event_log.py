@@ -0,0 +1,56 @@
+# memory/event_log.py
+import atexit
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import List, Set
+
+from memory.schemas import MemoryEvent
+from utils.file_lock import locked_append
+
+# Logs with buffered events (held until flushed, and flushed at exit)
+_DIRTY_LOGS: Set["EventLog"] = set()
+
+
+class EventLog:
+    """
+    Buffered JSONL log of MemoryEvents.
+
+    Events are serialised on `append` and written in a single locked append
+    by `flush` (once per run), or earlier once `max_events` are buffered or
+    the oldest buffered event is `max_age_s` old.
+    """
+    def __init__(self, path: str, max_events: int = 256, max_age_s: float = 5.0):
+        self.path = path
+        self.max_events = max_events
+        self.max_age_s = max_age_s
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lines: List[str] = []
+        self._first_ts = 0.0
+
+    def append(self, ev: MemoryEvent) -> None:
+        if not self._lines:
+            self._first_ts = time.monotonic()
+            _DIRTY_LOGS.add(self)
+        self._lines.append(json.dumps(asdict(ev), ensure_ascii=False) + "\n")
+        if len(self._lines) >= self.max_events or time.monotonic() - self._first_ts >= self.max_age_s:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._lines:
+            return
+        locked_append(self.path, "".join(self._lines))
+        self._lines.clear()
+        _DIRTY_LOGS.discard(self)
+
+    close = flush
+
+
+@atexit.register
+def _flush_dirty_logs() -> None:
+    for log in list(_DIRTY_LOGS):
+        try:
+            log.flush()
+        except Exception:
+            pass
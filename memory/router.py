@@ -1,15 +1,14 @@
 # memory/router.py
 from __future__ import annotations
 
-import json
-import os
 import time
-from dataclasses import asdict
 from typing import Any, Dict, List, Optional
 
 from memory.episodic import EpisodicStore
 from memory.semantic import SemanticStore
+from memory.event_log import EventLog
 from memory.schemas import MemoryEvent
+from utils.timing import span
 
 class MemoryRouter:
     """
@@ -25,16 +24,16 @@ class MemoryRouter:
     ):
         self.episodic = EpisodicStore(episodic_path)
         self.semantic = SemanticStore(semantic_path)
+        self.events = EventLog(events_path)
         self.events_path = events_path
-        os.makedirs(os.path.dirname(events_path), exist_ok=True)
 
     def _log_event(self, ev: MemoryEvent) -> None:
-        with open(self.events_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(asdict(ev), ensure_ascii=False) + "\n")
+        self.events.append(ev)
 
     # ---- Reads ----
     def read_semantic(self, key: str) -> Optional[Any]:
-        val = self.semantic.get(key)
+        with span("semantic.get"):
+            val = self.semantic.get(key)
         self._log_event(MemoryEvent(
             ts_utc=time.time(),
             event_type="read",
@@ -45,7 +44,8 @@ class MemoryRouter:
         return val
 
     def read_recent_episodic(self, n: int = 25) -> List[Dict[str, Any]]:
-        rows = self.episodic.tail(n=n)
+        with span("episodic.tail"):
+            rows = self.episodic.tail(n=n)
         self._log_event(MemoryEvent(
             ts_utc=time.time(),
             event_type="read",
@@ -57,7 +57,8 @@ class MemoryRouter:
 
     # ---- Writes ----
     def write_episodic(self, record: Dict[str, Any]) -> None:
-        self.episodic.append(record)
+        with span("episodic.append"):
+            self.episodic.append(record)
         self._log_event(MemoryEvent(
             ts_utc=time.time(),
             event_type="write",
@@ -67,7 +68,8 @@ class MemoryRouter:
         ))
 
     def write_semantic(self, key: str, value: Any) -> None:
-        self.semantic.set(key, value)
+        with span("semantic.set"):
+            self.semantic.set(key, value)
         self._log_event(MemoryEvent(
             ts_utc=time.time(),
             event_type="write",
@@ -75,3 +77,13 @@ class MemoryRouter:
             key=key,
             payload={"type": type(value).__name__},
         ))
+
+    def flush(self) -> None:
+        """Persist write-behind state (semantic writes, buffered events); call once per run."""
+        with span("semantic.flush"):
+            self.semantic.flush()
+        with span("events.flush"):
+            self.events.flush()
+
+    def close(self) -> None:
+        self.flush()
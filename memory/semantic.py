@@ -1,15 +1,38 @@
 # memory/semantic.py
+import atexit
 import os
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Set, Tuple
+
+from utils.file_lock import file_lock
+
+# Stores with unflushed writes (held until flushed, and flushed at exit)
+_DIRTY_STORES: Set["SemanticStore"] = set()
+
 
 class SemanticStore:
     """
     Small JSON dict store. Gating/dedup can be added later via policies/.
+
+    The dict is cached in-process. `get` only re-reads the file when its
+    stat (inode, size, mtime) changed since the last load, i.e. when another
+    process flushed. `set` is write-behind: values are visible to `get`
+    immediately and persisted by `flush` (once per run), which merges them
+    into the current file under the lock and atomically replaces it.
     """
     def __init__(self, path: str):
         self.path = path
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._data: Dict[str, Any] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._pending: Dict[str, Any] = {}
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
 
     def load(self) -> Dict[str, Any]:
         if not os.path.exists(self.path):
@@ -21,14 +44,50 @@ class SemanticStore:
             return {}
 
     def save(self, data: Dict[str, Any]) -> None:
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Write-then-rename: readers never see a half-written file
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def _refresh(self) -> None:
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        # Stat before read: a concurrent replace shows up as a change next time
+        self._data = self.load() if stamp is not None else {}
+        self._stamp = stamp
 
     def get(self, key: str) -> Optional[Any]:
-        data = self.load()
-        return data.get(key)
+        if key in self._pending:
+            return self._pending[key]
+        self._refresh()
+        return self._data.get(key)
 
     def set(self, key: str, value: Any) -> None:
-        data = self.load()
-        data[key] = value
-        self.save(data)
\ No newline at end of file
+        self._pending[key] = value
+        _DIRTY_STORES.add(self)
+
+    def flush(self) -> None:
+        """Persist pending writes (no-op when there are none)."""
+        if not self._pending:
+            return
+        # Read-modify-write under a lock so concurrent writers don't drop keys
+        with file_lock(self.path):
+            self._refresh()
+            data = dict(self._data)
+            data.update(self._pending)
+            self.save(data)
+            self._data = data
+            self._stamp = self._stat()
+        self._pending.clear()
+        _DIRTY_STORES.discard(self)
+
+
+@atexit.register
+def _flush_dirty_stores() -> None:
+    for store in list(_DIRTY_STORES):
+        try:
+            store.flush()
+        except Exception:
+            pass
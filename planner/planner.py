@@ -1,10 +1,12 @@
 # planner/planner.py
 from decision.decide import decide_retrieval
+from utils.timing import span
 from .plan_schema import Plan, PlanStep
 
 class Planner:
     def generate_plan(self, question: str, *, k: int = 4, wm=None, memory_signal=None) -> Plan:
-        decision = decide_retrieval(question)
+        with span("decide_retrieval"):
+            decision = decide_retrieval(question)
 
         memory_advice = (
             memory_signal.get("retrieval_advice")
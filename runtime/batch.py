@@ -0,0 +1,186 @@
+# runtime/batch.py
+"""
+Batch runner: answer a file of questions with a pool of worker processes.
+
+  python -m runtime.batch questions.jsonl --out results.jsonl --workers 4
+
+`--ingest-workers N` ingests PDFs in N processes if the corpus has to be
+built (no fresh snapshot).
+
+Input:
+  .jsonl  one request per line: {"question": ..., "id"?, "k"?, "enforce_policies"?}
+          (a bare JSON string is taken as the question)
+  .csv    header row with a "question" (or "question_text") column and
+          optional "id"/"question_id", "k", "enforce_policies" columns
+
+The corpus is loaded once in the parent before the pool starts, so forked
+workers inherit it (spawned workers open the on-disk snapshot). Each worker
+keeps one long-lived Runtime. Results are appended to `--out` as they
+complete (completion order, tagged with the input index); traces and memory
+writes go through the runtime's locked appenders as usual.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from runtime.run import Runtime
+from runtime.serve import handle_request
+from tools.retrieve_tool import corpus_chunk_features, set_ingest_workers
+
+_TRUE = {"1", "true", "yes", "y"}
+
+
+# -----
+# Input
+# -----
+
+def _csv_request(row: Dict[str, str], index: int) -> Dict[str, Any]:
+    request: Dict[str, Any] = {
+        "id": row.get("id") or row.get("question_id") or index,
+        "question": row.get("question") or row.get("question_text") or "",
+    }
+    if row.get("k"):
+        request["k"] = row["k"]
+    if row.get("enforce_policies"):
+        request["enforce_policies"] = row["enforce_policies"].strip().lower() in _TRUE
+    return request
+
+
+def read_questions(path: str) -> List[Dict[str, Any]]:
+    requests: List[Dict[str, Any]] = []
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                request = {"question": obj} if isinstance(obj, str) else dict(obj)
+                request.setdefault("id", len(requests))
+                requests.append(request)
+    elif path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                requests.append(_csv_request(row, len(requests)))
+    else:
+        raise ValueError(f"Unsupported question file (expected .jsonl or .csv): {path}")
+    return requests
+
+
+# -------
+# Workers
+# -------
+
+_RUNTIME: Runtime | None = None
+
+
+def _init_worker(profile_every: int = 0, trace_mode: str = "full") -> None:
+    global _RUNTIME
+    _RUNTIME = Runtime(preload=True, profile_every=profile_every, trace_mode=trace_mode)
+
+
+def _run_one(index: int, request: Dict[str, Any]) -> Dict[str, Any]:
+    _, body = handle_request(_RUNTIME, request)
+    return {"index": index, **body}
+
+
+def _results(
+    requests: List[Dict[str, Any]], workers: int, profile_every: int = 0, trace_mode: str = "full"
+) -> Iterator[Dict[str, Any]]:
+    if workers <= 1:
+        _init_worker(profile_every, trace_mode)
+        for i, request in enumerate(requests):
+            yield _run_one(i, request)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(profile_every, trace_mode)
+    ) as pool:
+        futures = [pool.submit(_run_one, i, r) for i, r in enumerate(requests)]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+# ---------
+# Reporting
+# ---------
+
+def summarize(latencies_ms: List[float], n_errors: int, wall_s: float) -> Dict[str, Any]:
+    lat = np.asarray(latencies_ms, dtype=float)
+    pct = np.percentile(lat, [50, 95, 99]) if lat.size else [float("nan")] * 3
+    return {
+        "requests": int(lat.size) + n_errors,
+        "errors": n_errors,
+        "wall_s": wall_s,
+        "throughput_rps": (lat.size / wall_s) if wall_s > 0 else float("nan"),
+        "p50_ms": float(pct[0]),
+        "p95_ms": float(pct[1]),
+        "p99_ms": float(pct[2]),
+    }
+
+
+def run_batch(
+    questions_path: str,
+    out_path: str,
+    workers: int = 1,
+    profile_every: int = 0,
+    trace_mode: str = "full",
+    ingest_workers: int = 1,
+) -> Dict[str, Any]:
+    requests = read_questions(questions_path)
+
+    # Load/build the corpus (and its snapshot) once, before workers start
+    set_ingest_workers(ingest_workers)
+    corpus_chunk_features()
+
+    latencies: List[float] = []
+    n_errors = 0
+    start = time.perf_counter()
+    with open(out_path, "w", encoding="utf-8") as out:
+        for result in _results(requests, workers, profile_every, trace_mode):
+            if "error" in result:
+                n_errors += 1
+            else:
+                latencies.append(result["latency_ms"])
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    return summarize(latencies, n_errors, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a question file through the runtime.")
+    parser.add_argument("questions", help=".jsonl or .csv question file")
+    parser.add_argument("--out", required=True, help="results JSONL (written as requests complete)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--profile-every", type=int, default=0, help="profile every N-th request per worker (logs/profiles/)")
+    parser.add_argument("--compact-traces", action="store_true", help="log retrieved chunks by id, not text")
+    parser.add_argument("--ingest-workers", type=int, default=1, help="processes used to ingest PDFs if the corpus must be built")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.questions,
+        args.out,
+        workers=args.workers,
+        profile_every=args.profile_every,
+        trace_mode="compact" if args.compact_traces else "full",
+        ingest_workers=args.ingest_workers,
+    )
+
+    print(
+        f"{summary['requests']} requests ({summary['errors']} errors) in {summary['wall_s']:.2f}s: "
+        f"{summary['throughput_rps']:.1f} req/s, "
+        f"p50 {summary['p50_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, p99 {summary['p99_ms']:.1f} ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 # runtime/run.py
+from __future__ import annotations
+
+import os
+import time
+
 from planner import Planner
 from executor import Executor
 # from response.generate import Generator
 from utils.logging_utils import write_trace
+from utils.timing import record, span
+from utils.profiling import PROFILE_DIR, profile, should_profile
 from memory import MemoryRouter
 from memory.working import WorkingMemory
 from policies.retrieval_policy import allow_retrieval
@@ -11,31 +18,111 @@ from policies.forgetting import apply_forgetting
 from policies.generation_policy import GenerationPolicy
 from generator.generator import Generator
 from evidence import EvidenceAssessor
+from tools.retrieve_tool import DEFAULT_PDF_DIR, corpus_chunk_features
+from tools.trace.compact import TRACE_MODES, compact_trace
 from dataclasses import asdict
 
 class Runtime:
+    """
+    Long-lived runtime: the memory router, planner, executor, evidence
+    assessor and generator are built once and shared by every `run`;
+    working memory is created fresh per question.
+    """
+
+    def __init__(
+        self,
+        *,
+        preload: bool = False,
+        memory: MemoryRouter | None = None,
+        timings: bool = True,
+        profile_every: int = 0,
+        profile_dir: str = PROFILE_DIR,
+        trace_mode: str = "full",
+    ):
+        if trace_mode not in TRACE_MODES:
+            raise ValueError(f"trace_mode must be one of {TRACE_MODES}, got {trace_mode!r}")
+        # timings: record per-stage spans into each trace ("timings" section)
+        self.timings = timings
+        # profile_every: cProfile + tracemalloc every N-th run (0 = off)
+        self.profile_every = profile_every
+        self.profile_dir = profile_dir
+        # trace_mode: "compact" logs retrieved chunks by id (see tools/trace/compact.py)
+        self.trace_mode = trace_mode
+        self._run_count = 0
+        self.memory = memory if memory is not None else MemoryRouter()
+        self.planner = Planner()
+        self.executor = Executor()
+        self.assessor = EvidenceAssessor()
+        self.generator = Generator()
+        if preload:
+            with profile(f"preload-{os.getpid()}", out_dir=profile_dir, enabled=profile_every > 0):
+                self.preload()
+
+    def preload(self, pdf_dir: str = DEFAULT_PDF_DIR) -> None:
+        """Load (or build) the retrieval corpus now instead of on the first retrieve."""
+        self.assessor.chunk_features = corpus_chunk_features(pdf_dir)
+
     def _serialize_plan(self, plan):
         return asdict(plan)
 
-    def run(self, question: str, *, k: int = 4, enforce_policies: bool = True):
-        mem = MemoryRouter()
+    def run(
+        self,
+        question: str,
+        *,
+        k: int = 4,
+        enforce_policies: bool = True,
+        question_id=None,
+        profile_run: bool | None = None,
+    ):
+        """
+        profile_run: force profiling on/off for this run (default: every
+        `profile_every`-th run). Artifacts are named after `question_id`.
+        """
+        self._run_count += 1
+        if profile_run is None:
+            profile_run = should_profile(self._run_count, self.profile_every)
+        profile_name = question_id if question_id is not None else f"run-{os.getpid()}-{self._run_count}"
+
+        started = time.time()
+        with profile(profile_name, out_dir=self.profile_dir, enabled=profile_run) as profile_paths:
+            with record("run", enabled=self.timings) as timings:
+                answer, trace = self._run(question, k=k, enforce_policies=enforce_policies)
+
+        trace["ts_utc"] = started
+        if question_id is not None:
+            trace["question_id"] = question_id
+        if timings is not None:
+            trace["timings"] = timings.to_dict()
+        if profile_paths is not None:
+            trace["profile"] = profile_paths
+        if self.trace_mode == "compact":
+            trace = compact_trace(trace)
+        write_trace(trace)
+
+        return answer
+
+    def _run(self, question: str, *, k: int, enforce_policies: bool):
+        """One question; returns (answer, trace event)."""
+        mem = self.memory
         wm = WorkingMemory()
         wm.goal = question
         
         # First step: prove persistence exists and is auditable.
-        last_user_question = mem.read_semantic("last_user_question")
-        recent_episodes = mem.read_recent_episodic(n=10)
-        if enforce_policies:
-            recent_episodes = apply_forgetting(recent_episodes)
-            force = allow_retrieval(wm=wm, episodic_tail=recent_episodes)
-        else:
-            force = False
-
-        planner = Planner()
-        plan = planner.generate_plan(question, k=k, wm=wm, memory_signal={"force_retrieval": force is True})
-
-        executor = Executor()
-        execution_trace = executor.execute(plan, wm=wm)
+        with span("memory.read"):
+            last_user_question = mem.read_semantic("last_user_question")
+            recent_episodes = mem.read_recent_episodic(n=10)
+        with span("policies.retrieval"):
+            if enforce_policies:
+                recent_episodes = apply_forgetting(recent_episodes)
+                force = allow_retrieval(wm=wm, episodic_tail=recent_episodes)
+            else:
+                force = False
+
+        with span("planner"):
+            plan = self.planner.generate_plan(question, k=k, wm=wm, memory_signal={"force_retrieval": force is True})
+
+        with span("executor"):
+            execution_trace = self.executor.execute(plan, wm=wm)
         # NOTE: If multiple retrieve steps exist, the last one wins by design.
 
         retrieved_context = ""
@@ -55,43 +142,50 @@ class Runtime:
 
         # right after the loop where you set executor_decision and all_chunks
         chunks_for_evidence = execution_trace[0].get("tool_result", {}).get("chunks", []) if executor_decision == "retrieve" else []
-        evidence_assessment = EvidenceAssessor().assess_evidence(
-            query=question,
-            executor_decision=executor_decision,
-            retrieved_chunks=chunks_for_evidence,
-        )
-
-        generation_decision = GenerationPolicy.decide(evidence_assessment)
-
-        generator = Generator()
-        answer = generator.generate(
-            question=question,
-            context=retrieved_context,
-            decision=generation_decision,
-            llm_call=lambda p: "<LLM_CALL_PLACEHOLDER>",
-        )
-
-
-        if not enforce_policies or allow_semantic_write("last_user_question", question, wm=wm, episodic_tail=recent_episodes):
-            mem.write_semantic("last_user_question", question)
-        if not enforce_policies or allow_semantic_write("last_answer_preview", answer[:200], wm=wm, episodic_tail=recent_episodes):
-            mem.write_semantic("last_answer_preview", answer[:200])
-
-        mem.write_episodic({
-            "ts_utc": __import__("time").time(),
-            "question": question,
-            "plan_actions": [s.action for s in plan.steps],
-            "used_retrieval": any(s["action"] == "retrieve" for s in execution_trace),
-            "last_user_question_before_run": last_user_question,
-            "recent_episode_count_before_run": len(recent_episodes),
-            "event": "evidence_assessment",
-            "executor_decision": executor_decision,
-            "evidence_assessment": evidence_assessment.__dict__,
-            "generation_policy_decision": generation_decision.decision,
-            "produced_text": answer is not None,
-        })
+        with span("evidence"):
+            # Retrieval already loaded the corpus, so this is an in-process cache hit
+            if executor_decision == "retrieve":
+                self.preload(execution_trace[0]["args"].get("pdf_dir", DEFAULT_PDF_DIR))
+            evidence_assessment = self.assessor.assess_evidence(
+                query=question,
+                executor_decision=executor_decision,
+                retrieved_chunks=chunks_for_evidence,
+            )
+
+        with span("generation_policy"):
+            generation_decision = GenerationPolicy.decide(evidence_assessment)
 
-        write_trace({
+        with span("generator"):
+            answer = self.generator.generate(
+                question=question,
+                context=retrieved_context,
+                decision=generation_decision,
+                llm_call=lambda p: "<LLM_CALL_PLACEHOLDER>",
+            )
+
+
+        with span("memory.write"):
+            if not enforce_policies or allow_semantic_write("last_user_question", question, wm=wm, episodic_tail=recent_episodes):
+                mem.write_semantic("last_user_question", question)
+            if not enforce_policies or allow_semantic_write("last_answer_preview", answer[:200], wm=wm, episodic_tail=recent_episodes):
+                mem.write_semantic("last_answer_preview", answer[:200])
+
+            mem.write_episodic({
+                "ts_utc": __import__("time").time(),
+                "question": question,
+                "plan_actions": [s.action for s in plan.steps],
+                "used_retrieval": any(s["action"] == "retrieve" for s in execution_trace),
+                "last_user_question_before_run": last_user_question,
+                "recent_episode_count_before_run": len(recent_episodes),
+                "event": "evidence_assessment",
+                "executor_decision": executor_decision,
+                "evidence_assessment": evidence_assessment.__dict__,
+                "generation_policy_decision": generation_decision.decision,
+                "produced_text": answer is not None,
+            })
+            mem.flush()
+
+        trace = {
             "question": question,
             "plan": self._serialize_plan(plan),
             "execution": execution_trace,
@@ -121,6 +215,6 @@ class Runtime:
                 "flags": wm.flags,
             },
             "policy_mode": enforce_policies,
-        })
+        }
 
-        return answer
+        return answer, trace
@@ -0,0 +1,141 @@
+# runtime/serve.py
+"""
+Serve questions from one long-lived Runtime (components and corpus are
+built once per process).
+
+  stdin JSONL:  one request per line, one response line per request
+  HTTP:         POST /ask with a JSON request body, GET /health
+
+Request:  {"question": str, "k": int = 4, "enforce_policies": bool = true, "id": any,
+           "profile": bool = false}
+Response: {"id": ..., "answer": str | null, "latency_ms": float}
+          or {"id": ..., "error": str} for malformed requests / failed runs
+
+Requests are answered one at a time: memory writes and traces are
+append-only files shared by every run.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, TextIO, Tuple
+
+from runtime.run import Runtime
+from tools.corpus import CORPUS_MANAGER
+from tools.retrieve_tool import query_cache_stats
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def handle_request(runtime: Runtime, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """Answer one request. Returns (HTTP-style status, response body)."""
+    req_id = request.get("id")
+    question = request.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return 400, {"id": req_id, "error": "missing 'question'"}
+    try:
+        k = int(request.get("k", 4))
+    except (TypeError, ValueError):
+        return 400, {"id": req_id, "error": "'k' must be an integer"}
+
+    start = time.perf_counter()
+    try:
+        answer = runtime.run(
+            question.strip(),
+            k=k,
+            enforce_policies=bool(request.get("enforce_policies", True)),
+            question_id=req_id,
+            profile_run=True if request.get("profile") else None,
+        )
+    except Exception as e:
+        return 500, {"id": req_id, "error": f"{type(e).__name__}: {e}"}
+
+    return 200, {
+        "id": req_id,
+        "answer": answer,
+        "latency_ms": (time.perf_counter() - start) * 1000.0,
+    }
+
+
+# ---------------
+# stdin JSONL loop
+# ---------------
+
+def serve_stdin(runtime: Runtime, stdin: TextIO | None = None, stdout: TextIO | None = None) -> None:
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"id": None, "error": f"invalid request: {e}"}
+        else:
+            _, response = handle_request(runtime, request)
+
+        stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+# -------------
+# HTTP endpoint
+# -------------
+
+def _make_handler(runtime: Runtime):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict[str, Any]) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {
+                    "status": "ok",
+                    "query_cache": query_cache_stats(),
+                    "corpora": {**CORPUS_MANAGER.snapshot_stats(), "sizes": CORPUS_MANAGER.sizes()},
+                })
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/ask":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as e:
+                self._send(400, {"id": None, "error": f"invalid request: {e}"})
+                return
+
+            self._send(*handle_request(runtime, request))
+
+        def log_message(self, format, *args):
+            # Keep stderr quiet; runs are already traced
+            pass
+
+    return Handler
+
+
+def serve_http(runtime: Runtime, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    server = HTTPServer((host, port), _make_handler(runtime))
+    print(f"Serving on http://{host}:{server.server_port} (POST /ask, GET /health)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
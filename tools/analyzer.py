@@ -0,0 +1,112 @@
+# tools/analyzer.py
+"""
+Shared text analyzer.
+
+One tokeniser (lowercase, `[a-z0-9]+`, no stemming) for the whole pipeline,
+an interned vocabulary mapping tokens to dense integer ids, and the
+stopword lists as precomputed per-id masks:
+
+  "default"   reranker features and evidence coverage
+  "chunking"  semantic chunking cohesion (keeps pronouns)
+
+BM25 does not filter stopwords.
+
+`analyze_chunks` tokenises every chunk once at corpus build time; BM25 and
+the chunk feature table are both built from its token id sequences.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "the","a","an","and","or","but","if","then","else","for","to","of","in","on","at","by",
+    "with","as","is","are","was","were","be","been","being","it","this","that","these","those",
+    "you","your","we","our","they","their","i","me","my","from","into","over","under","after",
+    "before","during","about","between","within","without","not","no","can","could","should",
+    "would","may","might","must","will","do","does","did"
+})
+
+CHUNKING_STOPWORDS = STOPWORDS - {"you","your","we","our","they","their","i","me","my"}
+
+STOPWORD_SETS = {
+    "default": STOPWORDS,
+    "chunking": CHUNKING_STOPWORDS,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    if not isinstance(text, str):
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def non_stop_tokens(text: str, variant: str = "default") -> List[str]:
+    stop = STOPWORD_SETS[variant]
+    return [t for t in tokenize(text) if t not in stop]
+
+
+class Vocabulary:
+    """Interned tokens <-> integer ids (first-seen order) with stopword masks."""
+
+    def __init__(self, tokens: Iterable[str] = ()):
+        self.token_ids: Dict[str, int] = {}
+        self.tokens: List[str] = []
+        self._stop = {variant: bytearray() for variant in STOPWORD_SETS}
+        for t in tokens:
+            self.intern(t)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def intern(self, token: str) -> int:
+        tid = self.token_ids.get(token)
+        if tid is None:
+            tid = self.token_ids[token] = len(self.tokens)
+            self.tokens.append(token)
+            for variant, words in STOPWORD_SETS.items():
+                self._stop[variant].append(token in words)
+        return tid
+
+    def encode(self, text: str) -> List[int]:
+        """Token id sequence of `text`, interning unseen tokens."""
+        return [self.intern(t) for t in tokenize(text)]
+
+    def lookup(self, tokens: Iterable[str]) -> List[int]:
+        """Ids of already known tokens (unknown tokens are skipped)."""
+        ids = self.token_ids
+        return [ids[t] for t in tokens if t in ids]
+
+    def content_ids(self, text: str, variant: str = "default") -> set:
+        """Distinct non-stop token ids of `text`, interning unseen tokens."""
+        stop = self._stop[variant]
+        return {tid for tid in self.encode(text) if not stop[tid]}
+
+    def stop_mask(self, variant: str = "default") -> np.ndarray:
+        """Boolean array over token ids: True where the token is a stopword."""
+        return np.frombuffer(bytes(self._stop[variant]), dtype=bool)
+
+
+def analyze_chunks(chunks: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Tokenise each chunk once. Returns a fresh vocabulary (exactly the tokens
+    of `chunks`, ids in first-seen order) and a CSR table in `chunks` order:
+      tok_seq[tok_offsets[r]:tok_offsets[r + 1]]  token ids of row r, in text order
+    """
+    vocab = Vocabulary()
+    chunk_ids, offsets, seq = [], [0], []
+    for cid, info in chunks.items():
+        seq.extend(vocab.encode(info["text"]))
+        chunk_ids.append(cid)
+        offsets.append(len(seq))
+
+    return {
+        "vocab": vocab,
+        "chunk_ids": chunk_ids,
+        "tok_offsets": np.array(offsets, dtype=np.int64),
+        "tok_seq": np.array(seq, dtype=np.int32),
+    }
@@ -0,0 +1,202 @@
+# tools/corpus.py
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from tools.retriever_core import (
+    create_vector_store,
+    create_bm25_index,
+)
+from tools.reranker_core import create_chunk_features
+from tools.analyzer import analyze_chunks
+from tools.corpus_manager import CorpusManager
+from tools.ingest import iter_pdf_text, iter_chunks
+from tools.text_cache import TextCache
+from utils.timing import span
+from tools.corpus_snapshot import (
+    SNAPSHOT_ROOT,
+    corpus_fingerprint,
+    open_snapshot,
+    snapshot_path,
+    source_fingerprints,
+    write_snapshot,
+)
+
+# -------------------------
+# Corpus bootstrap (cached)
+# -------------------------
+
+# Sentinel: use the shared on-disk TextCache
+_DEFAULT_TEXT_CACHE = object()
+
+
+def _text_cache(text_cache):
+    if text_cache is _DEFAULT_TEXT_CACHE:
+        return TextCache()
+    return text_cache
+
+
+def _extract_chunks(pdf_path: str, chunking_strategy: str, text_cache: TextCache | None = None):
+    """
+    Extract and chunk one PDF as a stream (pages -> normalise -> dedupe ->
+    chunk), so only the chunk list is ever held for the whole document.
+    Module-level so process pools can pickle it.
+    """
+    text = iter_pdf_text(pdf_path, cache=text_cache)
+    try:
+        return list(iter_chunks(text, strategy=chunking_strategy))
+    finally:
+        # Closes the page stream now, so a cache entry is committed even if
+        # the chunker stopped before the end of the document
+        text.close()
+
+
+def build_corpus(
+    pdf_dir: str,
+    chunking_strategy: str = "fixed",
+    max_chunks: int = 1000,
+    workers: int = 1,
+    text_cache=_DEFAULT_TEXT_CACHE,
+):
+    """
+    workers > 1 extracts and chunks PDFs in a process pool. Global chunk ids
+    are still assigned afterwards in sorted filename order, so the result is
+    identical to the sequential build.
+
+    Extracted page text is read from / written to `text_cache` (the shared
+    artifacts/text_cache by default; None disables it), so unchanged PDFs
+    skip pdfplumber.
+    """
+    text_cache = _text_cache(text_cache)
+    filenames = [f for f in sorted(os.listdir(pdf_dir)) if f.endswith(".pdf")]
+    paths = [os.path.join(pdf_dir, f) for f in filenames]
+
+    with span("ingest"):
+        if workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+                per_file = list(pool.map(
+                    _extract_chunks, paths, repeat(chunking_strategy), repeat(text_cache)
+                ))
+        else:
+            per_file = [_extract_chunks(p, chunking_strategy, text_cache) for p in paths]
+
+    all_chunks = {}
+    global_chunk_id = 0
+
+    for filename, chunks in zip(filenames, per_file):
+        for chunk_text in chunks:
+            all_chunks[global_chunk_id] = {
+                "doc_id": filename,
+                "text": chunk_text,
+            }
+            global_chunk_id += 1
+            # NOTE: only stops the current file; later files still add one chunk each
+            if global_chunk_id >= max_chunks:
+                break
+
+    with span("index"):
+        # Every chunk is tokenised once; BM25 and the chunk features share the ids
+        analyzed = analyze_chunks(all_chunks)
+
+        vector_store = create_vector_store(all_chunks)
+        bm25_index = create_bm25_index(all_chunks, analyzed=analyzed)
+        chunk_features = create_chunk_features(all_chunks, analyzed=analyzed)
+
+    return {
+        "chunks": all_chunks,
+        "vector_store": vector_store,
+        "bm25_index": bm25_index,
+        "chunk_features": chunk_features,
+    }
+
+
+def load_corpus(
+    pdf_dir: str,
+    chunking_strategy: str = "fixed",
+    max_chunks: int = 1000,
+    snapshot_root: str | None = SNAPSHOT_ROOT,
+    workers: int = 1,
+    text_cache=_DEFAULT_TEXT_CACHE,
+):
+    """
+    In-process cache -> on-disk snapshot -> full rebuild (which then writes
+    a fresh snapshot). Pass snapshot_root=None to bypass snapshots and
+    workers > 1 to ingest PDFs in parallel on rebuild.
+
+    The in-process cache is CORPUS_MANAGER: byte-budgeted, LRU-evicted
+    (see tools/corpus_manager.py; reload_corpus / unload_corpus below).
+    """
+    return CORPUS_MANAGER.get(
+        pdf_dir,
+        chunking_strategy,
+        max_chunks,
+        snapshot_root=snapshot_root,
+        workers=workers,
+        text_cache=text_cache,
+    )
+
+
+def _open_or_build_corpus(
+    pdf_dir: str,
+    chunking_strategy: str,
+    max_chunks: int,
+    snapshot_root: str | None = SNAPSHOT_ROOT,
+    workers: int = 1,
+    text_cache=_DEFAULT_TEXT_CACHE,
+):
+    """On-disk snapshot -> full rebuild (which then writes a fresh snapshot)."""
+    payload = None
+    if snapshot_root:
+        snap_dir = snapshot_path(pdf_dir, chunking_strategy, max_chunks, root=snapshot_root)
+        with span("snapshot_open"):
+            payload = open_snapshot(
+                snap_dir,
+                pdf_dir=pdf_dir,
+                chunking_strategy=chunking_strategy,
+                max_chunks=max_chunks,
+            )
+
+    if payload is None:
+        with span("build_corpus"):
+            # One hash per PDF: the text cache reuses the digests recorded here
+            text_cache = _text_cache(text_cache)
+            sources = source_fingerprints(pdf_dir, text_cache.content_hash if text_cache is not None else None)
+            payload = build_corpus(
+                pdf_dir,
+                chunking_strategy,
+                max_chunks,
+                workers=workers,
+                text_cache=text_cache,
+            )
+            payload["fingerprint"] = corpus_fingerprint(sources, chunking_strategy, max_chunks)
+
+        if snapshot_root:
+            try:
+                os.makedirs(snapshot_root, exist_ok=True)
+                with span("snapshot_write"):
+                    write_snapshot(
+                        snap_dir,
+                        payload,
+                        sources=sources,
+                        chunking_strategy=chunking_strategy,
+                        max_chunks=max_chunks,
+                    )
+            except OSError:
+                # Snapshot is an optimisation; the in-memory corpus is still valid
+                pass
+
+    return payload
+
+
+CORPUS_MANAGER = CorpusManager(_open_or_build_corpus)
+
+
+def reload_corpus(pdf_dir: str, chunking_strategy: str = "fixed", max_chunks: int = 1000, **kwargs):
+    """Reload a corpus in place (picks up changed PDFs: the stale snapshot is rebuilt)."""
+    return CORPUS_MANAGER.reload(pdf_dir, chunking_strategy, max_chunks, **kwargs)
+
+
+def unload_corpus(pdf_dir: str | None = None, chunking_strategy: str | None = None, max_chunks: int | None = None) -> int:
+    """Drop cached corpora (all matching the given fields); returns how many."""
+    return CORPUS_MANAGER.unload(pdf_dir, chunking_strategy, max_chunks)
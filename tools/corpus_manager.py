@@ -0,0 +1,207 @@
+# tools/corpus_manager.py
+"""
+In-process corpus cache with a byte budget.
+
+Each loaded corpus (one `load_corpus` payload per pdf_dir / chunking
+strategy / max_chunks) is sized once when it is loaded:
+
+  heap_bytes     Python objects and in-memory arrays, each object counted
+                 once (chunk text is shared by `chunks`, the vector store
+                 and the BM25 `meta` table, so it is only counted once)
+  mapped_bytes   memory-mapped snapshot arrays (page cache, shared between
+                 processes mapping the same snapshot)
+
+When the total exceeds `max_bytes`, least recently used corpora are
+evicted until it fits. The corpus just requested is never evicted, so a
+corpus larger than the whole budget is still served, alone.
+
+Loads (snapshot open or full rebuild) hold only a per-corpus lock: other
+corpora keep being served meanwhile, and concurrent requests for the
+corpus being loaded wait for that one load.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+CorpusKey = Tuple[str, str, int]
+
+
+# -----------
+# Size model
+# -----------
+
+def _array_root(arr: np.ndarray) -> Any:
+    """The object that owns an array's memory (itself, a parent array or an mmap)."""
+    root = arr
+    while getattr(root, "base", None) is not None:
+        root = root.base
+    return root
+
+
+def corpus_nbytes(payload: Any) -> Dict[str, int]:
+    """{"heap_bytes", "mapped_bytes"} of everything reachable from `payload`."""
+    seen = set()
+    heap = mapped = 0
+    stack = [payload]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, np.ndarray):
+            # Views share their owner's buffer: count each owner once
+            root = _array_root(obj)
+            if root is not obj:
+                heap += sys.getsizeof(obj)
+                if id(root) in seen:
+                    continue
+                seen.add(id(root))
+            if isinstance(root, mmap.mmap):
+                mapped += len(root)
+            else:
+                heap += sys.getsizeof(root)  # includes the buffer of an owning array
+            continue
+
+        heap += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            stack.append(vars(obj))
+    return {"heap_bytes": heap, "mapped_bytes": mapped}
+
+
+# --------------
+# Corpus manager
+# --------------
+
+def _dir_key(pdf_dir: str) -> str:
+    """One key per directory however it is spelled ("data/input_pdfs/", "./data/input_pdfs", ...)."""
+    return os.path.normpath(os.path.abspath(pdf_dir))
+
+
+class CorpusManager:
+    def __init__(self, loader: Callable[..., Dict[str, Any]], max_bytes: Optional[int] = DEFAULT_MAX_BYTES):
+        # loader(pdf_dir, chunking_strategy, max_chunks, **kwargs) -> payload
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0, "unloads": 0}
+        self._entries: "OrderedDict[CorpusKey, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        # One lock per corpus being loaded: a build only blocks requests for the same corpus
+        self._loading: Dict[CorpusKey, threading.Lock] = {}
+
+    def __contains__(self, key: CorpusKey) -> bool:
+        return (_dir_key(key[0]), *key[1:]) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, pdf_dir: str, chunking_strategy: str = "fixed", max_chunks: int = 1000, **load_kwargs) -> Dict[str, Any]:
+        """The cached corpus, loading it (and evicting others) if needed."""
+        key = (_dir_key(pdf_dir), chunking_strategy, max_chunks)
+        payload = self._cached(key)
+        if payload is not None:
+            return payload
+
+        with self._lock:
+            load_lock = self._loading.setdefault(key, threading.Lock())
+        with load_lock:
+            # Another thread may have loaded it while this one waited
+            payload = self._cached(key)
+            if payload is not None:
+                return payload
+            try:
+                payload = self.loader(pdf_dir, chunking_strategy, max_chunks, **load_kwargs)
+                sizes = corpus_nbytes(payload)
+                with self._lock:
+                    self._entries[key] = {"payload": payload, **sizes}
+                    self.stats["loads"] += 1
+                    self._evict(keep=key)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            return payload
+
+    def _cached(self, key: CorpusKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["payload"]
+
+    def reload(self, pdf_dir: str, chunking_strategy: str = "fixed", max_chunks: int = 1000, **load_kwargs) -> Dict[str, Any]:
+        """Drop the cached copy and load again (reopens the snapshot, or rebuilds if sources changed)."""
+        with self._lock:
+            self._entries.pop((_dir_key(pdf_dir), chunking_strategy, max_chunks), None)
+        return self.get(pdf_dir, chunking_strategy, max_chunks, **load_kwargs)
+
+    def unload(self, pdf_dir: Optional[str] = None, chunking_strategy: Optional[str] = None, max_chunks: Optional[int] = None) -> int:
+        """Drop every cached corpus matching the given fields (all if none given); returns how many."""
+        pdf_dir = _dir_key(pdf_dir) if pdf_dir is not None else None
+        with self._lock:
+            drop = [
+                key for key in self._entries
+                if (pdf_dir is None or key[0] == pdf_dir)
+                and (chunking_strategy is None or key[1] == chunking_strategy)
+                and (max_chunks is None or key[2] == max_chunks)
+            ]
+            for key in drop:
+                del self._entries[key]
+            self.stats["unloads"] += len(drop)
+            return len(drop)
+
+    def _entry_bytes(self, entry: Dict[str, Any]) -> int:
+        return entry["heap_bytes"] + entry["mapped_bytes"]
+
+    def total_bytes(self) -> int:
+        return sum(self._entry_bytes(e) for e in self._entries.values())
+
+    def _evict(self, keep: CorpusKey) -> None:
+        if self.max_bytes is None:
+            return
+        total = self.total_bytes()
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._entry_bytes(self._entries.pop(key))
+            self.stats["evictions"] += 1
+
+    def set_budget(self, max_bytes: Optional[int]) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            # Keep the most recently used corpus
+            if self._entries:
+                self._evict(keep=next(reversed(self._entries)))
+
+    def sizes(self) -> Dict[str, Dict[str, Any]]:
+        """Per-corpus size accounting, least recently used first."""
+        with self._lock:
+            return {
+                f"{pdf_dir}:{strategy}:{max_chunks}": {
+                    "heap_bytes": e["heap_bytes"],
+                    "mapped_bytes": e["mapped_bytes"],
+                    "fingerprint": e["payload"].get("fingerprint"),
+                }
+                for (pdf_dir, strategy, max_chunks), e in self._entries.items()
+            }
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, corpora=len(self._entries), total_bytes=self.total_bytes(), max_bytes=self.max_bytes)
@@ -0,0 +1,337 @@
+# tools/corpus_snapshot.py
+"""
+Versioned on-disk corpus snapshot.
+
+A snapshot is a directory holding everything `_load_corpus` builds:
+
+  manifest.json        format version, chunking strategy, max_chunks,
+                       source-file fingerprints, BM25 params, fingerprint
+  chunks.json          chunk table (chunk_ids, doc_ids, texts)
+  embeddings.npy       dense embedding matrix
+  inv_norms.npy        precomputed inverse row norms
+  terms.json           analyzer vocabulary (token id order), shared by
+                       BM25 and the chunk features
+  idf.npy, doc_len.npy, len_norm.npy,
+  post_offsets.npy, post_docs.npy, post_tf.npy,
+  post_impact.npy, term_max_impact.npy
+                       BM25 postings arrays (CSR layout, see create_bm25_index)
+  feat_*.npy           per-chunk reranker/evidence features
+                       (see create_chunk_features)
+
+Arrays are opened with memory mapping, so a fresh process pays only for
+the JSON tables. A snapshot is stale when the format version, chunking
+strategy, max_chunks or any source PDF differs from what it was built from.
+
+When a rebuild replaces a snapshot, the old chunk table is kept as
+<root>/retired/<fingerprint>.chunks.json, so compact traces written against
+the old build stay resolvable (tools/trace/compact.py). Deleting those
+files only makes such traces resolve to null text.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from tools.retriever_core import DenseStore
+
+SNAPSHOT_VERSION = 3
+SNAPSHOT_ROOT = os.path.join("artifacts", "corpus_snapshots")
+RETIRED_DIR = "retired"
+
+_BM25_ARRAYS = (
+    "idf", "doc_len", "len_norm",
+    "post_offsets", "post_docs", "post_tf", "post_impact", "term_max_impact",
+)
+
+_FEATURE_ARRAYS = ("tok_offsets", "tok_ids", "n_content", "pattern", "len_penalty")
+
+
+# -------------------
+# Source fingerprints
+# -------------------
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_files(pdf_dir: str) -> List[str]:
+    return [f for f in sorted(os.listdir(pdf_dir)) if f.endswith(".pdf")]
+
+
+def source_fingerprints(pdf_dir: str, content_hash: Optional[Callable[[str], str]] = None) -> List[Dict[str, Any]]:
+    """
+    content_hash(path) -> sha256 hex digest; pass TextCache.content_hash so
+    the digest is shared with (and recorded for) the text cache.
+    """
+    content_hash = content_hash or _sha256
+    out = []
+    for filename in source_files(pdf_dir):
+        path = os.path.join(pdf_dir, filename)
+        st = os.stat(path)
+        out.append({
+            "file": filename,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": content_hash(path),
+        })
+    return out
+
+
+def _sources_match(recorded: List[Dict[str, Any]], pdf_dir: str) -> bool:
+    """
+    Cheap size+mtime check first; content hash only when mtime moved.
+    A file whose mtime moved but whose content did not gets its recorded
+    mtime_ns updated in place (see open_snapshot), so it is hashed once.
+    A source that disappears or cannot be read mid-check counts as changed.
+    """
+    try:
+        if [r["file"] for r in recorded] != source_files(pdf_dir):
+            return False
+        for r in recorded:
+            path = os.path.join(pdf_dir, r["file"])
+            st = os.stat(path)
+            if st.st_size != r["size"]:
+                return False
+            if st.st_mtime_ns != r["mtime_ns"]:
+                if _sha256(path) != r["sha256"]:
+                    return False
+                r["mtime_ns"] = st.st_mtime_ns
+    except OSError:
+        return False
+    return True
+
+
+def corpus_fingerprint(sources: List[Dict[str, Any]], chunking_strategy: str, max_chunks: int) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "chunking_strategy": chunking_strategy,
+        "max_chunks": max_chunks,
+        "sources": [(s["file"], s["sha256"]) for s in sources],
+    }, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def snapshot_path(pdf_dir: str, chunking_strategy: str, max_chunks: int, root: str = SNAPSHOT_ROOT) -> str:
+    key = hashlib.sha256(os.path.abspath(pdf_dir).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(root, f"{key}-{chunking_strategy}-{max_chunks}")
+
+
+# -----------
+# Write / open
+# -----------
+
+def write_snapshot(
+    path: str,
+    corpus: Dict[str, Any],
+    *,
+    sources: List[Dict[str, Any]],
+    chunking_strategy: str,
+    max_chunks: int,
+) -> str:
+    """
+    Write `corpus` (the `_load_corpus` payload) to `path`.
+    Written to a temporary directory first and renamed into place.
+    """
+    store = corpus["vector_store"]
+    bm25 = corpus["bm25_index"]
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    with open(os.path.join(tmp, "chunks.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "chunk_ids": store.chunk_ids,
+            "doc_ids": store.doc_ids,
+            "texts": store.texts,
+        }, f, ensure_ascii=False)
+
+    np.save(os.path.join(tmp, "embeddings.npy"), np.asarray(store.matrix))
+    np.save(os.path.join(tmp, "inv_norms.npy"), np.asarray(store.inv_norms))
+
+    terms = list(bm25["term_ids"])
+    with open(os.path.join(tmp, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f, ensure_ascii=False)
+
+    arrays = {
+        "idf": np.array([bm25["idf"][t] for t in terms], dtype=np.float64),
+        "doc_len": np.asarray(bm25["doc_len"], dtype=np.int64),
+    }
+    for name in _BM25_ARRAYS:
+        arr = arrays.get(name, bm25.get(name))
+        np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(arr))
+
+    features = corpus["chunk_features"]
+    for name in _FEATURE_ARRAYS:
+        np.save(os.path.join(tmp, f"feat_{name}.npy"), np.asarray(features[name]))
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "chunking_strategy": chunking_strategy,
+        "max_chunks": max_chunks,
+        "sources": sources,
+        "fingerprint": corpus_fingerprint(sources, chunking_strategy, max_chunks),
+        "num_chunks": len(store),
+        "bm25": {"k1": bm25["k1"], "b": bm25["b"], "N": bm25["N"], "avgdl": bm25["avgdl"]},
+    }
+    # Manifest last: a directory without one is never opened
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Move the old snapshot aside before swapping the new one in, so the
+    # directory is only missing between two renames (not during a delete)
+    old = f"{path}.old-{os.getpid()}"
+    shutil.rmtree(old, ignore_errors=True)
+    try:
+        os.replace(path, old)
+    except FileNotFoundError:
+        old = None
+    os.replace(tmp, path)
+    if old is not None:
+        _retire_chunk_table(old, os.path.dirname(path), manifest["fingerprint"])
+        shutil.rmtree(old, ignore_errors=True)
+    return manifest["fingerprint"]
+
+
+def retired_chunks_path(root: str, fingerprint: str) -> str:
+    return os.path.join(root, RETIRED_DIR, f"{fingerprint}.chunks.json")
+
+
+def _retire_chunk_table(old_dir: str, root: str, new_fingerprint: str) -> None:
+    """Keep a replaced build's chunk table under its fingerprint (compact traces refer to it)."""
+    previous = read_manifest(old_dir)
+    if not previous or not previous.get("fingerprint") or previous["fingerprint"] == new_fingerprint:
+        return
+    try:
+        os.makedirs(os.path.join(root, RETIRED_DIR), exist_ok=True)
+        os.replace(os.path.join(old_dir, "chunks.json"), retired_chunks_path(root, previous["fingerprint"]))
+    except OSError:
+        pass  # those traces resolve to null text
+
+
+def _rewrite_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    tmp = os.path.join(path, f"manifest.json.tmp-{os.getpid()}")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(path, "manifest.json"))
+    except OSError:
+        # Only an optimisation: the snapshot is still valid
+        pass
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(
+    manifest: Optional[Dict[str, Any]],
+    *,
+    pdf_dir: str,
+    chunking_strategy: str,
+    max_chunks: int,
+) -> bool:
+    return (
+        manifest is not None
+        and manifest.get("version") == SNAPSHOT_VERSION
+        and manifest.get("chunking_strategy") == chunking_strategy
+        and manifest.get("max_chunks") == max_chunks
+        and _sources_match(manifest.get("sources", []), pdf_dir)
+    )
+
+
+def open_snapshot(
+    path: str,
+    *,
+    pdf_dir: str,
+    chunking_strategy: str,
+    max_chunks: int,
+    mmap: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """
+    Open a snapshot as a `_load_corpus` payload.
+    Returns None if it is missing, unreadable or stale.
+    """
+    manifest = read_manifest(path)
+    recorded_mtimes = [r.get("mtime_ns") for r in manifest.get("sources", [])] if manifest else None
+    if not is_fresh(manifest, pdf_dir=pdf_dir, chunking_strategy=chunking_strategy, max_chunks=max_chunks):
+        return None
+    if [r["mtime_ns"] for r in manifest["sources"]] != recorded_mtimes:
+        # Same content, new mtimes (checkout/copy): record them so later opens skip hashing
+        _rewrite_manifest(path, manifest)
+
+    mmap_mode = "r" if mmap else None
+
+    def load(name):
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    try:
+        with open(os.path.join(path, "chunks.json"), "r", encoding="utf-8") as f:
+            table = json.load(f)
+        with open(os.path.join(path, "terms.json"), "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        arrays = {name: load(name) for name in _BM25_ARRAYS}
+        feature_arrays = {name: load(f"feat_{name}") for name in _FEATURE_ARRAYS}
+        embeddings = load("embeddings")
+        inv_norms = load("inv_norms")
+    except (OSError, ValueError):
+        return None
+
+    chunk_ids = table["chunk_ids"]
+    doc_ids = table["doc_ids"]
+    texts = table["texts"]
+
+    chunks = {
+        cid: {"doc_id": doc_id, "text": text}
+        for cid, doc_id, text in zip(chunk_ids, doc_ids, texts)
+    }
+
+    vector_store = DenseStore(chunk_ids, doc_ids, texts, embeddings, inv_norms=inv_norms)
+
+    idf_values = arrays["idf"].tolist()
+    df_values = np.diff(arrays["post_offsets"]).tolist()
+    term_ids = {t: i for i, t in enumerate(terms)}
+    bm25_index = {
+        **manifest["bm25"],
+        "chunk_ids": chunk_ids,
+        "doc_len": arrays["doc_len"].tolist(),
+        "df": dict(zip(terms, df_values)),
+        "idf": dict(zip(terms, idf_values)),
+        "term_ids": term_ids,
+        "post_offsets": arrays["post_offsets"],
+        "post_docs": arrays["post_docs"],
+        "post_tf": arrays["post_tf"],
+        "post_impact": arrays["post_impact"],
+        "term_max_impact": arrays["term_max_impact"],
+        "len_norm": arrays["len_norm"],
+        "meta": {cid: (doc_id, text) for cid, doc_id, text in zip(chunk_ids, doc_ids, texts)},
+    }
+
+    chunk_features = {
+        **feature_arrays,
+        "chunk_ids": chunk_ids,
+        "rows": {cid: r for r, cid in enumerate(chunk_ids)},
+        "token_ids": term_ids,
+    }
+
+    return {
+        "chunks": chunks,
+        "vector_store": vector_store,
+        "bm25_index": bm25_index,
+        "chunk_features": chunk_features,
+        "fingerprint": manifest["fingerprint"],
+    }
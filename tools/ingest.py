@@ -3,61 +3,85 @@ import pdfplumber
 import unicodedata
 import re
 
-_TOKEN_RE = re.compile(r"[a-z0-9]+")
-
-_STOPWORDS = {
-    "the","a","an","and","or","but","if","then","else","for","to","of","in","on","at","by",
-    "with","as","is","are","was","were","be","been","being","it","this","that","these","those",
-    "from","into","over","under","after","before","during","about","between","within","without",
-    "not","no","can","could","should","would","may","might","must","will","do","does","did"
+from tools.analyzer import Vocabulary
+
+# Explicit PDF mojibake fixes
+_MOJIBAKE_REPLACEMENTS = {
+    "â€“": "–",
+    "â€”": "—",
+    "â€™": "’",
+    "â€œ": "“",
+    "â€�": "”",
+    "â†’": "→",
+    "â‰¥": "≥",
+    "â‰¤": "≤",
+    "Âµ": "µ",
+    "Â°": "°",
+    "Ã—": "×",
+    "Ã·": "÷",
+    "Â±": "±",
+    "Â²": "²",
+    "Â³": "³",
+    "â€¢": "•",
+    "âˆ‘": "∑",
+    "âˆš": "√",
 }
 
-def _tokens(text: str):
-    return {t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS}
-
 def fix_pdf_mojibake(text: str) -> str:
     # Unicode canonical normalization
     text = unicodedata.normalize("NFKC", text)
 
-    # Explicit PDF mojibake fixes
-    replacements = {
-        "â€“": "–",
-        "â€”": "—",
-        "â€™": "’",
-        "â€œ": "“",
-        "â€�": "”",
-        "â†’": "→",
-        "â‰¥": "≥",
-        "â‰¤": "≤",
-        "Âµ": "µ",
-        "Â°": "°",
-        "Ã—": "×",
-        "Ã·": "÷",
-        "Â±": "±",
-        "Â²": "²",
-        "Â³": "³",
-        "â€¢": "•",
-        "âˆ‘": "∑",
-        "âˆš": "√",
-    }
-
-
-    for bad, good in replacements.items():
+    for bad, good in _MOJIBAKE_REPLACEMENTS.items():
         text = text.replace(bad, good)
 
     return text
 
-# Function to load PDF and extract text
-def load_pdf(pdf_path):
+# -------------------------------------------------------------
+# Single-pass normaliser (byte-identical to NFKC + fix_pdf_mojibake)
+# -------------------------------------------------------------
+
+# The sequential replaces above can chain: "â€”" becomes "—", which a later
+# pass then reads as part of "Ã—". This is the only such chain in the table.
+_MOJIBAKE_TABLE = {
+    **_MOJIBAKE_REPLACEMENTS,
+    "Ãâ€”": "×",
+}
+
+# Longest first, so the chained form wins over its "â€”" suffix
+_MOJIBAKE_RE = re.compile(
+    "|".join(re.escape(k) for k in sorted(_MOJIBAKE_TABLE, key=len, reverse=True))
+)
+
+def _mojibake_sub(match) -> str:
+    return _MOJIBAKE_TABLE[match.group()]
+
+def normalize_pdf_text(text: str) -> str:
+    """
+    NFKC plus every mojibake repair in one regex scan. Pure-ASCII text is
+    returned untouched (NFKC is the identity on ASCII and every pattern
+    contains a non-ASCII character).
+    """
+    if text.isascii():
+        return text
+    return _MOJIBAKE_RE.sub(_mojibake_sub, unicodedata.normalize("NFKC", text))
+
+# Bump when page extraction/normalisation output changes (invalidates text caches)
+EXTRACTION_VERSION = 1
+
+# -----------------------------------------------------------
+# Streaming ingest: pages -> normalise -> dedupe -> chunk
+# -----------------------------------------------------------
+
+def _iter_extracted_pages(pdf_path):
     with pdfplumber.open(pdf_path) as pdf:
-        text = ""
         previous_page_text = ""
 
         for page in pdf.pages:
             page_text = page.extract_text() or ""
+            # pdfplumber keeps parsed page objects alive; drop them as we go
+            page.close()
 
-            page_text = unicodedata.normalize("NFKC", page_text)
-            page_text = fix_pdf_mojibake(page_text)
+            page_text = normalize_pdf_text(page_text)
 
             normalized_text = " ".join(page_text.split())
 
@@ -67,32 +91,107 @@ def load_pdf(pdf_path):
             if normalized_text == previous_page_text:
                 continue
 
-            text += normalized_text + "\n"
             previous_page_text = normalized_text
+            yield normalized_text
+
+# Generator of normalised, de-duplicated page texts (optionally cached)
+def iter_pdf_pages(pdf_path, cache=None):
+    if cache is None:
+        yield from _iter_extracted_pages(pdf_path)
+        return
+
+    cached = cache.iter_pages(pdf_path, EXTRACTION_VERSION)
+    if cached is not None:
+        yield from cached
+        return
+
+    # Cache entry is only committed if the whole document was read
+    pages = _iter_extracted_pages(pdf_path)
+    with cache.writer(pdf_path, EXTRACTION_VERSION) as write:
+        try:
+            for page in pages:
+                write(page)
+                yield page
+        except GeneratorExit:
+            # The consumer stopped early (e.g. the chunker hit max_chunks):
+            # read the rest so the entry is still committed
+            try:
+                for page in pages:
+                    write(page)
+            except Exception:
+                raise GeneratorExit
+
+# Document as a stream of text pieces: each page followed by a newline
+def iter_pdf_text(pdf_path, cache=None):
+    pages = iter_pdf_pages(pdf_path, cache=cache)
+    try:
+        for page in pages:
+            yield page + "\n"
+    finally:
+        pages.close()
+
+def load_pdf_pages(pdf_path, cache=None):
+    return list(iter_pdf_pages(pdf_path, cache=cache))
 
-    return text
-
-def chunk_fixed(text, chunk_size=500, overlap=50, max_chunks=1000):
-    chunks = {}
+# Function to load PDF and extract text
+def load_pdf(pdf_path, cache=None):
+    return "".join(iter_pdf_text(pdf_path, cache=cache))
+
+
+def _pieces(text):
+    """Chunkers take either one string or an iterable of text pieces."""
+    return [text] if isinstance(text, str) else text
+
+def _iter_lines(pieces):
+    """Equivalent to "".join(pieces).split("\n"), without joining."""
+    rest = ""
+    for piece in pieces:
+        parts = (rest + piece).split("\n")
+        rest = parts.pop()
+        yield from parts
+    yield rest
+
+def iter_chunk_fixed(pieces, chunk_size=500, overlap=50, max_chunks=1000):
+    if overlap > chunk_size:
+        # Window moves backwards; not streamable, keep the whole-text walk
+        pieces = ["".join(pieces)]
+
+    it = iter(pieces)
+    buf = ""          # text[offset:]
+    offset = 0
     start = 0
-    text_length = len(text)
-    chunk_id = 0
+    exhausted = False
+    emitted = 0
+
+    while emitted < max_chunks:
+        # Read until the window is covered plus one char (so we know it is not the end)
+        while not exhausted and offset + len(buf) <= start + chunk_size:
+            try:
+                buf += next(it)
+            except StopIteration:
+                exhausted = True
+
+        text_length = offset + len(buf)
+        if start >= text_length:
+            break
 
-    while start < text_length and chunk_id < max_chunks:
         end = min(start + chunk_size, text_length)
-        chunk = text[start:end]
-        chunks[chunk_id] = chunk
-        chunk_id += 1
+        yield buf[start - offset:end - offset]
+        emitted += 1
 
         if end == text_length:
             break
 
         start = end - overlap if overlap > 0 else end
+        if start > offset:
+            buf = buf[start - offset:]
+            offset = start
 
-    return chunks
+def chunk_fixed(text, chunk_size=500, overlap=50, max_chunks=1000):
+    return dict(enumerate(iter_chunk_fixed(_pieces(text), chunk_size, overlap, max_chunks)))
 
-def chunk_structural(
-    text: str,
+def iter_chunk_structural(
+    pieces,
     max_chars: int = 900,
     min_chars: int = 250,
     merge_window_chars: int = 1200,
@@ -100,12 +199,9 @@ def chunk_structural(
 ):
     """
     Structural chunking based on paragraph / header / list boundaries.
-    Deterministic, PDF-robust.
+    Deterministic, PDF-robust. Each step is a generator stage.
     """
 
-    # --- Step 1: split into lines ---
-    lines = [l.strip() for l in text.split("\n") if l.strip()]
-
     def is_header(line: str) -> bool:
         if len(line) > 80:
             return False
@@ -119,79 +215,95 @@ def chunk_structural(
     def is_bullet(line: str) -> bool:
         return bool(re.match(r"^[-•*]\s+|\d+[\.\)]\s+", line))
 
-    # --- Step 2: build structural blocks ---
-    blocks = []
-    current = []
-
-    for line in lines:
-        if is_header(line) or is_bullet(line):
-            if current:
-                blocks.append(" ".join(current))
-                current = []
-            current.append(line)
-        else:
-            current.append(line)
+    # --- Step 1+2: split into lines, build structural blocks ---
+    def blocks():
+        current = []
+        for raw in _iter_lines(pieces):
+            line = raw.strip()
+            if not line:
+                continue
+            if is_header(line) or is_bullet(line):
+                if current:
+                    yield " ".join(current)
+                    current = []
+                current.append(line)
+            else:
+                current.append(line)
 
-    if current:
-        blocks.append(" ".join(current))
+        if current:
+            yield " ".join(current)
 
     # --- Step 3: merge blocks into chunks ---
-    chunks = []
-    buf = ""
-
-    for block in blocks:
-        if not buf:
-            buf = block
-            continue
+    def merged_blocks():
+        buf = ""
+        for block in blocks():
+            if not buf:
+                buf = block
+                continue
 
-        if len(buf) + len(block) <= max_chars:
-            buf += " " + block
-        else:
-            chunks.append(buf)
-            buf = block
+            if len(buf) + len(block) <= max_chars:
+                buf += " " + block
+            else:
+                yield buf
+                buf = block
 
-    if buf:
-        chunks.append(buf)
+        if buf:
+            yield buf
 
     # --- Step 4: enforce min size by back-merging ---
-    merged = []
-    for c in chunks:
-        if len(c) < min_chars and merged:
-            if len(merged[-1]) + len(c) <= merge_window_chars:
-                merged[-1] += " " + c
-            else:
-                merged.append(c)
-        else:
-            merged.append(c)
+    def back_merged():
+        last = None
+        for c in merged_blocks():
+            if len(c) < min_chars and last is not None:
+                if len(last) + len(c) <= merge_window_chars:
+                    last += " " + c
+                    continue
+            if last is not None:
+                yield last
+            last = c
+        if last is not None:
+            yield last
 
     # --- Step 5: split oversized chunks safely ---
-    final_chunks = []
     sentence_split = re.compile(r"(?<=[\.\!\?;])\s+")
 
-    for c in merged:
-        if len(c) <= merge_window_chars:
-            final_chunks.append(c)
-        else:
-            sentences = sentence_split.split(c)
-            buf = ""
-            for s in sentences:
-                if len(buf) + len(s) <= max_chars:
-                    buf += " " + s if buf else s
-                else:
-                    final_chunks.append(buf)
-                    buf = s
-            if buf:
-                final_chunks.append(buf)
-
-    # --- Step 6: cap and index ---
-    out = {}
-    for i, c in enumerate(final_chunks[:max_chunks]):
-        out[i] = c.strip()
-
-    return out
+    def final_chunks():
+        for c in back_merged():
+            if len(c) <= merge_window_chars:
+                yield c
+            else:
+                sentences = sentence_split.split(c)
+                buf = ""
+                for s in sentences:
+                    if len(buf) + len(s) <= max_chars:
+                        buf += " " + s if buf else s
+                    else:
+                        yield buf
+                        buf = s
+                if buf:
+                    yield buf
+
+    # --- Step 6: cap ---
+    for i, c in enumerate(final_chunks()):
+        if i >= max_chunks:
+            break
+        yield c.strip()
 
-def chunk_semantic(
-    text: str,
+def chunk_structural(
+    text,
+    max_chars: int = 900,
+    min_chars: int = 250,
+    merge_window_chars: int = 1200,
+    max_chunks: int = 1000,
+):
+    return dict(enumerate(iter_chunk_structural(
+        _pieces(text), max_chars, min_chars, merge_window_chars, max_chunks,
+    )))
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[\.\!\?])\s+|\n+")
+
+def iter_chunk_semantic(
+    pieces,
     target_chars: int = 700,
     min_chars: int = 300,
     max_chars: int = 1100,
@@ -205,72 +317,105 @@ def chunk_semantic(
     """
 
     # --- Step 1: sentence segmentation ---
-    sentences = re.split(r"(?<=[\.\!\?])\s+|\n+", text)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-
-    chunks = []
-    cur_sents = []
-    cur_tokens = set()
-    cur_len = 0
-
-    def flush():
-        nonlocal cur_sents, cur_tokens, cur_len
-        if cur_sents:
-            chunks.append(" ".join(cur_sents))
+    # Every newline is a sentence boundary, so splitting line by line
+    # yields the same sentences as splitting the whole text.
+    def sentences():
+        for line in _iter_lines(pieces):
+            for s in _SENTENCE_SPLIT.split(line):
+                s = s.strip()
+                if len(s) > 20:
+                    yield s
+
+    # Each sentence is tokenised once; token sets hold interned ids
+    vocab = Vocabulary()
+
+    def chunks():
         cur_sents = []
+        cur_sent_tokens = []
         cur_tokens = set()
         cur_len = 0
 
-    for s in sentences:
-        s_tokens = _tokens(s)
-
-        # rolling topic tokens
-        topic_tokens = cur_tokens if cur_tokens else s_tokens
-        overlap = (
-            len(s_tokens & topic_tokens) / max(len(s_tokens | topic_tokens), 1)
-        )
-
-        should_split = (
-            cur_len >= min_chars
-            and overlap < similarity_threshold
-            and cur_len >= target_chars
-        )
-
-        if should_split or cur_len + len(s) > max_chars:
-            flush()
-
-        cur_sents.append(s)
-        cur_len += len(s)
-        cur_tokens |= s_tokens
+        for s in sentences():
+            s_tokens = vocab.content_ids(s, "chunking")
+
+            # rolling topic tokens
+            topic_tokens = cur_tokens if cur_tokens else s_tokens
+            overlap = (
+                len(s_tokens & topic_tokens) / max(len(s_tokens | topic_tokens), 1)
+            )
+
+            should_split = (
+                cur_len >= min_chars
+                and overlap < similarity_threshold
+                and cur_len >= target_chars
+            )
+
+            if should_split or cur_len + len(s) > max_chars:
+                # flush
+                if cur_sents:
+                    yield " ".join(cur_sents)
+                cur_sents = []
+                cur_sent_tokens = []
+                cur_tokens = set()
+                cur_len = 0
+
+            cur_sents.append(s)
+            cur_sent_tokens.append(s_tokens)
+            cur_len += len(s)
+            cur_tokens |= s_tokens
+
+            # restrict topic drift
+            if len(cur_sents) > lookback_sentences:
+                recent = cur_sent_tokens[-lookback_sentences:]
+                cur_tokens = set().union(*recent)
 
-        # restrict topic drift
-        if len(cur_sents) > lookback_sentences:
-            recent = cur_sents[-lookback_sentences:]
-            cur_tokens = set().union(*(_tokens(x) for x in recent))
-
-    flush()
+        if cur_sents:
+            yield " ".join(cur_sents)
 
     # --- Step 2: merge undersized chunks ---
-    merged = []
-    for c in chunks:
-        if len(c) < min_chars and merged:
-            merged[-1] += " " + c
-        else:
-            merged.append(c)
+    def merged():
+        last = None
+        for c in chunks():
+            if len(c) < min_chars and last is not None:
+                last += " " + c
+                continue
+            if last is not None:
+                yield last
+            last = c
+        if last is not None:
+            yield last
+
+    # --- Step 3: cap ---
+    for i, c in enumerate(merged()):
+        if i >= max_chunks:
+            break
+        yield c.strip()
 
-    # --- Step 3: cap and index ---
-    out = {}
-    for i, c in enumerate(merged[:max_chunks]):
-        out[i] = c.strip()
+def chunk_semantic(
+    text,
+    target_chars: int = 700,
+    min_chars: int = 300,
+    max_chars: int = 1100,
+    similarity_threshold: float = 0.18,
+    lookback_sentences: int = 2,
+    max_chunks: int = 1000,
+):
+    return dict(enumerate(iter_chunk_semantic(
+        _pieces(text), target_chars, min_chars, max_chars,
+        similarity_threshold, lookback_sentences, max_chunks,
+    )))
+
+_CHUNKERS = {
+    "fixed": iter_chunk_fixed,
+    "structural": iter_chunk_structural,
+    "semantic": iter_chunk_semantic,
+}
 
-    return out
+def iter_chunks(text, strategy="fixed", **kwargs):
+    """Stream chunks from a string or an iterable of text pieces."""
+    if strategy not in _CHUNKERS:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return _CHUNKERS[strategy](_pieces(text), **kwargs)
 
 def chunk_texts(text, strategy="fixed", **kwargs):
-    if strategy == "fixed":
-        return chunk_fixed(text, **kwargs)
-    elif strategy == "structural":
-        return chunk_structural(text, **kwargs)
-    elif strategy == "semantic":
-        return chunk_semantic(text, **kwargs)
-    else:
-        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return dict(enumerate(iter_chunks(text, strategy=strategy, **kwargs)))
@@ -0,0 +1,191 @@
+# tools/query_cache.py
+"""
+Result cache for `retrieve_tool`.
+
+Entries are keyed by the corpus fingerprint, the ranking version (see
+`ranking_version`), `k`, `enable_rerank` and the normalised question. Normalisation keeps exactly what retrieval reads from
+the question, so a hit returns what a fresh run would:
+
+  question[:EMBEDDING_SIZE]   the dense (diagnostic) embedding
+  tokenize(question)          BM25 and the reranker's query terms
+
+e.g. questions that differ only in punctuation or spacing after the first
+EMBEDDING_SIZE characters share an entry. Case or leading-whitespace
+changes do not: they change the dense embedding.
+
+Memory tier: bounded LRU with optional TTL. Disk tier (optional): one JSON
+file per entry under <disk_dir>/<fingerprint>/<ranking version>/, shared
+across processes. A rebuilt corpus has a new fingerprint, and changed
+ranking code or weights a new ranking version, so old entries can never be
+hit; `track_corpus` also drops a corpus's entries as soon as it is seen to
+change.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from tools.analyzer import tokenize
+from tools.retriever_core import EMBEDDING_SIZE
+
+QUERY_CACHE_DIR = os.path.join("artifacts", "query_cache")
+
+# Modules whose code decides what retrieve_tool returns for a given corpus
+_RANKING_MODULES = ("tools.analyzer", "tools.retriever_core", "tools.reranker_core", "tools.retrieve_tool")
+
+Key = Tuple[Any, ...]
+
+
+@lru_cache(maxsize=None)
+def _ranking_code_digest() -> str:
+    h = hashlib.sha256()
+    for name in _RANKING_MODULES:
+        __import__(name)
+        with open(sys.modules[name].__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def ranking_version() -> str:
+    """Digest of the ranking code and DEFAULT_WEIGHTS: changes whenever cached results could."""
+    from tools.reranker_core import DEFAULT_WEIGHTS
+
+    h = hashlib.sha256(_ranking_code_digest().encode("ascii"))
+    h.update(json.dumps(DEFAULT_WEIGHTS, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def query_cache_key(question: str, k: int, enable_rerank: bool, fingerprint: str) -> Key:
+    return (
+        fingerprint, ranking_version(), int(k), bool(enable_rerank),
+        question[:EMBEDDING_SIZE], tuple(tokenize(question)),
+    )
+
+
+class QueryCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: Optional[float] = None,
+        disk_dir: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.disk_dir = disk_dir
+        self.stats = {
+            "hits": 0, "disk_hits": 0, "misses": 0, "puts": 0,
+            "evictions": 0, "expired": 0, "invalidated": 0,
+        }
+        self._entries: "OrderedDict[Key, Tuple[float, Any]]" = OrderedDict()
+        self._corpora: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_s is not None and time.time() - stored_at > self.ttl_s
+
+    # ---- Lookup ----
+    def get(self, key: Key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, value[0], value[1])
+                return value[1]
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key: Key, value: Any) -> None:
+        stored_at = time.time()
+        with self._lock:
+            self.stats["puts"] += 1
+            self._remember(key, stored_at, value)
+        self._disk_put(key, stored_at, value)
+
+    def _remember(self, key: Key, stored_at: float, value: Any) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ---- Invalidation ----
+    def track_corpus(self, scope: str, fingerprint: Optional[str]) -> None:
+        """Record the corpus fingerprint `scope` (its pdf_dir) now has; drop the previous one's entries."""
+        # Same normalisation as the corpus manager: one scope per directory
+        scope = os.path.normpath(os.path.abspath(scope))
+        with self._lock:
+            previous = self._corpora.get(scope)
+            self._corpora[scope] = fingerprint
+        if previous is not None and previous != fingerprint:
+            self.invalidate(previous)
+
+    def invalidate(self, fingerprint: Optional[str] = None) -> None:
+        """Drop every entry of `fingerprint` (all entries if None)."""
+        with self._lock:
+            stale = [key for key in self._entries if fingerprint is None or key[0] == fingerprint]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidated"] += len(stale)
+        if self.disk_dir:
+            target = self.disk_dir if fingerprint is None else os.path.join(self.disk_dir, fingerprint)
+            shutil.rmtree(target, ignore_errors=True)
+
+    # ---- Disk tier ----
+    def _disk_path(self, key: Key) -> str:
+        digest = hashlib.sha256(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, str(key[0]), str(key[1]), f"{digest}.json")
+
+    def _disk_get(self, key: Key) -> Optional[Tuple[float, Any]]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Guard against digest collisions; tuples come back as lists
+        if record.get("key") != json.loads(json.dumps(key)) or self._expired(record["stored_at"]):
+            return None
+        return record["stored_at"], record["value"]
+
+    def _disk_put(self, key: Key, stored_at: float, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "stored_at": stored_at, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            # The disk tier is an optimisation; the memory entry is still valid
+            pass
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries), max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -1,60 +1,51 @@
 # tools/reranker_core.py
 from __future__ import annotations
 import re
-from typing import Dict, List
+from typing import Any, Dict, List
 
 import numpy as np
 import pandas as pd
 
+# Tokenisation is shared with BM25, semantic chunking and evidence coverage
+from tools.analyzer import analyze_chunks, non_stop_tokens, tokenize
+
 # -------------------------
-# Tokenization helpers
+# Feature functions
 # -------------------------
 
-_TOKEN_RE = re.compile(r"[a-z0-9]+")
-
-_STOPWORDS = {
-    "the","a","an","and","or","but","if","then","else","for","to","of","in","on","at","by",
-    "with","as","is","are","was","were","be","been","being","it","this","that","these","those",
-    "you","your","we","our","they","their","i","me","my","from","into","over","under","after",
-    "before","during","about","between","within","without","not","no","can","could","should",
-    "would","may","might","must","will","do","does","did"
-}
-
-def tokenize(text: str) -> List[str]:
-    if not isinstance(text, str):
-        return []
-    return _TOKEN_RE.findall(text.lower())
-
+def _query_terms(query_text: str):
+    """(set of non-stop tokens, top keyphrases) for a question."""
+    q_tokens = non_stop_tokens(query_text)
+    keys = sorted(dict.fromkeys(q_tokens), key=lambda t: (-len(t), t))
+    return set(q_tokens), keys
 
-def non_stop_tokens(text: str) -> List[str]:
-    return [t for t in tokenize(text) if t not in _STOPWORDS]
 
+def _chunk_terms(chunk_text: str):
+    """(set of non-stop tokens, set of all tokens) for a chunk."""
+    return set(non_stop_tokens(chunk_text)), set(tokenize(chunk_text))
 
-# -------------------------
-# Feature functions
-# -------------------------
 
-def overlap_score(chunk_text: str, query_text: str) -> float:
-    c = set(non_stop_tokens(chunk_text))
-    q = set(non_stop_tokens(query_text))
+def _overlap(c: set, q: set) -> float:
     if not c or not q:
         return 0.0
     return len(c & q) / max(len(c | q), 1)
 
 
-def keyphrase_score(chunk_text: str, query_text: str, top_n: int = 6) -> float:
-    keys = sorted(
-        dict.fromkeys(non_stop_tokens(query_text)),
-        key=lambda t: (-len(t), t)
-    )[:top_n]
-
+def _keyphrase(cset: set, keys: List[str]) -> float:
     if not keys:
         return 0.0
-
-    cset = set(tokenize(chunk_text))
     return sum(1 for k in keys if k in cset) / len(keys)
 
 
+def overlap_score(chunk_text: str, query_text: str) -> float:
+    return _overlap(_chunk_terms(chunk_text)[0], _query_terms(query_text)[0])
+
+
+def keyphrase_score(chunk_text: str, query_text: str, top_n: int = 6) -> float:
+    keys = _query_terms(query_text)[1][:top_n]
+    return _keyphrase(_chunk_terms(chunk_text)[1], keys)
+
+
 _PATTERNS = [
     r"\b(is|are)\s+defined\s+as\b",
     r"\bmeans\b",
@@ -66,10 +57,17 @@ _PATTERNS = [
     r"\bshould\b",
 ]
 
+# All patterns as one alternation with a named group each. Every pattern is
+# a run of whole words and no two share a word, so non-overlapping matches
+# still find every pattern that occurs.
+_PATTERN_MATCHER = re.compile(
+    "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(_PATTERNS))
+)
+
 def pattern_score(text: str) -> float:
     if not isinstance(text, str):
         return 0.0
-    hits = sum(1 for p in _PATTERNS if re.search(p, text.lower()))
+    hits = len({m.lastgroup for m in _PATTERN_MATCHER.finditer(text.lower())})
     return min(hits, 4) / 4.0
 
 
@@ -81,6 +79,126 @@ def length_penalty(text: str, min_chars: int = 200) -> float:
         return 0.0
     return (min_chars - n) / min_chars
 
+
+def candidate_features(question_texts, chunk_texts, *, top_n: int = 6) -> Dict[str, np.ndarray]:
+    """
+    Batched feature engine for aligned (question, chunk) rows.
+
+    Each distinct question and each distinct chunk is tokenised and
+    pattern-matched once; per-row columns are then filled by indexing
+    (overlap/keyphrase once per distinct pair).
+    Values are identical to the scalar feature functions.
+    """
+    q_codes, q_uniques = pd.factorize(pd.Series(question_texts, dtype=object), use_na_sentinel=False)
+    c_codes, c_uniques = pd.factorize(pd.Series(chunk_texts, dtype=object), use_na_sentinel=False)
+
+    q_terms = [_query_terms(q) for q in q_uniques]
+    c_terms = [_chunk_terms(c) for c in c_uniques]
+
+    pattern = np.array([pattern_score(c) for c in c_uniques], dtype=float)
+    len_pen = np.array([length_penalty(c) for c in c_uniques], dtype=float)
+
+    overlap = np.empty(len(q_codes))
+    keyphrase = np.empty(len(q_codes))
+    pairs: Dict[tuple, tuple] = {}
+    for row, pair in enumerate(zip(q_codes.tolist(), c_codes.tolist())):
+        if pair not in pairs:
+            (q_set, keys), (c_set, c_all) = q_terms[pair[0]], c_terms[pair[1]]
+            pairs[pair] = (_overlap(c_set, q_set), _keyphrase(c_all, keys[:top_n]))
+        overlap[row], keyphrase[row] = pairs[pair]
+
+    return {
+        "overlap": overlap,
+        "keyphrase": keyphrase,
+        "pattern": pattern[c_codes],
+        "len_penalty": len_pen[c_codes],
+    }
+
+# -------------------------
+# Index-time chunk features
+# -------------------------
+
+def create_chunk_features(chunks: Dict[int, Dict[str, Any]], analyzed: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    Everything the reranker (and evidence coverage) needs from a chunk that
+    does not depend on the query, computed once at corpus build time.
+
+    Token sets come from the `analyze_chunks` token ids (shared with BM25)
+    and are stored as a CSR table over that vocabulary:
+      tok_ids[tok_offsets[r]:tok_offsets[r + 1]]  sorted distinct token ids of row r
+      n_content[r]                                 how many of them are non-stop
+    Rows follow `chunks` order; `rows` maps chunk_id -> row.
+    """
+    if analyzed is None:
+        analyzed = analyze_chunks(chunks)
+
+    vocab = analyzed["vocab"]
+    chunk_ids = list(analyzed["chunk_ids"])
+    n = len(chunk_ids)
+
+    # Distinct (row, token id) pairs, sorted by row then id
+    stride = max(len(vocab), 1)
+    row_of_tok = np.repeat(np.arange(n, dtype=np.int64), np.diff(analyzed["tok_offsets"]))
+    pairs = np.unique(row_of_tok * stride + analyzed["tok_seq"])
+    pair_rows = pairs // stride
+    tok_ids = (pairs % stride).astype(np.int32)
+
+    tok_offsets = np.zeros(n + 1, dtype=np.int64)
+    tok_offsets[1:] = np.cumsum(np.bincount(pair_rows, minlength=n))
+    content = ~vocab.stop_mask("default")[tok_ids]
+
+    texts = [t if isinstance(t, str) else "" for t in (chunks[cid]["text"] for cid in chunk_ids)]
+
+    return {
+        "chunk_ids": chunk_ids,
+        "rows": {cid: r for r, cid in enumerate(chunk_ids)},
+        "token_ids": vocab.token_ids,
+        "tok_offsets": tok_offsets,
+        "tok_ids": tok_ids,
+        "n_content": np.bincount(pair_rows[content], minlength=n).astype(np.int32),
+        "pattern": np.array([pattern_score(t) for t in texts], dtype=np.float64),
+        "len_penalty": np.array([length_penalty(t) for t in texts], dtype=np.float64),
+    }
+
+
+def lookup_features(table: Dict[str, Any], chunk_ids, query_text: str, *, top_n: int = 6) -> Dict[str, np.ndarray]:
+    """
+    Feature columns for candidate `chunk_ids` of one question, read from a
+    `create_chunk_features` table. Only the query side is tokenised here;
+    values are identical to the scalar feature functions.
+    """
+    rows = np.array([table["rows"][cid] for cid in chunk_ids], dtype=np.int64)
+    n = len(rows)
+
+    # Gather every candidate's token ids into one flat array + row segment ids
+    starts = table["tok_offsets"][rows]
+    lens = table["tok_offsets"][rows + 1] - starts
+    seg = np.repeat(np.arange(n), lens)
+    idx = np.repeat(starts - (np.cumsum(lens) - lens), lens) + np.arange(int(lens.sum()))
+    toks = table["tok_ids"][idx]
+
+    q_set, keys = _query_terms(query_text)
+    keys = keys[:top_n]
+    token_ids = table["token_ids"]
+
+    def hits(terms) -> np.ndarray:
+        ids = np.array([token_ids[t] for t in terms if t in token_ids], dtype=np.int32)
+        return np.bincount(seg[np.isin(toks, ids)], minlength=n)
+
+    # Query terms are non-stop, so every hit is a non-stop chunk token
+    inter = hits(q_set)
+    n_c = table["n_content"][rows]
+    union = np.maximum(n_c + len(q_set) - inter, 1)
+    overlap = np.where((n_c == 0) | (len(q_set) == 0), 0.0, inter / union)
+    keyphrase = hits(keys) / len(keys) if keys else np.zeros(n)
+
+    return {
+        "overlap": overlap.astype(np.float64),
+        "keyphrase": np.asarray(keyphrase, dtype=np.float64),
+        "pattern": table["pattern"][rows],
+        "len_penalty": table["len_penalty"][rows],
+    }
+
 # -------------------------
 # Normalization
 # -------------------------
@@ -94,6 +212,30 @@ def minmax(series: pd.Series) -> pd.Series:
         return pd.Series([0.0] * len(s), index=s.index)
     return (s - mn) / (mx - mn + 1e-12)
 
+def minmax_array(values) -> np.ndarray:
+    """`minmax` on a plain array (None -> NaN, NaN ignored for min/max)."""
+    s = np.asarray(values, dtype=float)
+    present = ~np.isnan(s)
+    if not present.any():
+        return np.zeros(len(s))
+    mn, mx = s[present].min(), s[present].max()
+    if mn == mx:
+        return np.zeros(len(s))
+    return (s - mn) / (mx - mn + 1e-12)
+
+# -------------------------
+# Reranking
+# -------------------------
+
+DEFAULT_WEIGHTS = {
+    "wd": 0.4,
+    "wb": 0.3,
+    "wo": 0.1,
+    "wk": 0.1,
+    "wp": 0.0,
+    "wl": 0.1,
+}
+
 def rerank_candidates(
     candidates: pd.DataFrame,
     *,
@@ -115,14 +257,7 @@ def rerank_candidates(
         - rerank_rank
     """
 
-    w = weights or {
-        "wd": 0.4,
-        "wb": 0.3,
-        "wo": 0.1,
-        "wk": 0.1,
-        "wp": 0.0,
-        "wl": 0.1,
-    }
+    w = weights or DEFAULT_WEIGHTS
 
     df = candidates.copy()
 
@@ -135,10 +270,9 @@ def rerank_candidates(
     df["norm_sparse"] = df.groupby("question_id")["sparse_score"].transform(minmax)
 
     # Features
-    df["overlap"] = df.apply(lambda r: overlap_score(r.chunk_text, r.question_text), axis=1)
-    df["keyphrase"] = df.apply(lambda r: keyphrase_score(r.chunk_text, r.question_text), axis=1)
-    df["pattern"] = df["chunk_text"].apply(pattern_score)
-    df["len_penalty"] = df["chunk_text"].apply(length_penalty)
+    features = candidate_features(df["question_text"], df["chunk_text"])
+    for name, values in features.items():
+        df[name] = values
 
     # Final score
     df["S"] = (
@@ -155,3 +289,67 @@ def rerank_candidates(
     df["rerank_rank"] = df.groupby("question_id").cumcount() + 1
 
     return df
+
+
+def rerank_single(
+    question_text: str,
+    chunk_texts,
+    dense_scores,
+    sparse_scores,
+    *,
+    weights: Dict[str, float] | None = None,
+    top_n: int = 6,
+    chunk_ids=None,
+    chunk_features: Dict[str, Any] | None = None,
+):
+    """
+    Single-question reranker on plain arrays (no DataFrame).
+
+    Same S and ordering as `rerank_candidates` for one question_id:
+    identical min-max semantics, the same left-to-right weighted sum and a
+    stable descending sort with NaN last.
+
+    With `chunk_ids` and a `create_chunk_features` table, chunk-side
+    features are looked up instead of recomputed from `chunk_texts`.
+
+    Returns:
+      (order, S) where order lists candidate indices best-first
+    """
+    w = weights or DEFAULT_WEIGHTS
+
+    # Safety
+    question_text = question_text if isinstance(question_text, str) else ""
+
+    norm_dense = minmax_array(dense_scores)
+    norm_sparse = minmax_array(sparse_scores)
+
+    if chunk_features is not None and chunk_ids is not None:
+        f = lookup_features(chunk_features, chunk_ids, question_text, top_n=top_n)
+        overlap, keyphrase = f["overlap"], f["keyphrase"]
+        pattern, len_pen = f["pattern"], f["len_penalty"]
+    else:
+        chunk_texts = [c if isinstance(c, str) else "" for c in chunk_texts]
+        q_set, keys = _query_terms(question_text)
+        keys = keys[:top_n]
+        n = len(chunk_texts)
+        overlap, keyphrase = np.empty(n), np.empty(n)
+        pattern, len_pen = np.empty(n), np.empty(n)
+        for i, text in enumerate(chunk_texts):
+            c_set, c_all = _chunk_terms(text)
+            overlap[i] = _overlap(c_set, q_set)
+            keyphrase[i] = _keyphrase(c_all, keys)
+            pattern[i] = pattern_score(text)
+            len_pen[i] = length_penalty(text)
+
+    S = (
+        w["wd"] * norm_dense +
+        w["wb"] * norm_sparse +
+        w["wo"] * overlap +
+        w["wk"] * keyphrase +
+        w["wp"] * pattern -
+        w["wl"] * len_pen
+    )
+
+    # -S puts NaN last, like sort_values(ascending=False)
+    order = np.argsort(-S, kind="stable")
+    return order, S
@@ -1,17 +1,25 @@
 # tools/retrieve_tool.py
 from __future__ import annotations
-import os
 from dataclasses import dataclass
 from typing import Dict, Any
 
 # --- imports from your old repos ---
-from tools.retriever_core import (
-    create_vector_store,
-    create_bm25_index,
-    hybrid_retriever,
-)
-from tools.reranker_core import rerank_candidates
-from tools.ingest import load_pdf, chunk_texts
+from tools.retriever_core import hybrid_retriever
+from tools.reranker_core import rerank_single
+from tools.corpus import load_corpus
+from tools.query_cache import QueryCache, query_cache_key
+from utils.timing import span
+
+# Corpus bootstrap now lives in tools/corpus.py (shared with the probes)
+_load_corpus = load_corpus
+
+DEFAULT_PDF_DIR = "data/input_pdfs/"
+
+# Result cache shared by every retrieve_tool call in the process (None = off)
+_QUERY_CACHE: QueryCache | None = QueryCache()
+
+# Processes used to ingest PDFs when the corpus has to be (re)built
+_INGEST_WORKERS = 1
 
 
 # --------------
@@ -26,54 +34,6 @@ class RetrievedChunk:
     source: str
 
 
-# -------------------------
-# Corpus bootstrap (cached)
-# -------------------------
-
-_CORPUS_CACHE: Dict[str, Any] = {}
-
-
-def _load_corpus(
-    pdf_dir: str,
-    chunking_strategy: str = "fixed",
-    max_chunks: int = 1000,
-):
-    cache_key = f"{pdf_dir}:{chunking_strategy}:{max_chunks}"
-    if cache_key in _CORPUS_CACHE:
-        return _CORPUS_CACHE[cache_key]
-
-    all_chunks = {}
-    global_chunk_id = 0
-
-    for filename in sorted(os.listdir(pdf_dir)):
-        if not filename.endswith(".pdf"):
-            continue
-
-        text = load_pdf(os.path.join(pdf_dir, filename))
-        chunks = chunk_texts(text, strategy=chunking_strategy)
-
-        for _, chunk_text in chunks.items():
-            all_chunks[global_chunk_id] = {
-                "doc_id": filename,
-                "text": chunk_text,
-            }
-            global_chunk_id += 1
-            if global_chunk_id >= max_chunks:
-                break
-
-    vector_store = create_vector_store(all_chunks)
-    bm25_index = create_bm25_index(all_chunks)
-
-    payload = {
-        "chunks": all_chunks,
-        "vector_store": vector_store,
-        "bm25_index": bm25_index,
-    }
-
-    _CORPUS_CACHE[cache_key] = payload
-    return payload
-
-
 # --------------
 # Retrieval Tool
 # --------------
@@ -81,52 +41,56 @@ def _load_corpus(
 def retrieve_tool(
     question: str,
     k: int = 4,
-    pdf_dir: str = "data/input_pdfs/",
+    pdf_dir: str = DEFAULT_PDF_DIR,
     enable_rerank: bool = True,
 ) -> Dict[str, Any]:
 
-    corpus = _load_corpus(
-        pdf_dir=pdf_dir,
-        chunking_strategy="fixed",
-    )
-
-    raw_results = hybrid_retriever(
-        question,
-        corpus["vector_store"],
-        corpus["bm25_index"],
-        top_k=max(k * 5, 20),
-    )
-
-    QUESTION_ID = 0  # single-query context
+    with span("corpus_load"):
+        corpus = _load_corpus(
+            pdf_dir=pdf_dir,
+            chunking_strategy="fixed",
+            workers=_INGEST_WORKERS,
+        )
+
+    cache = _QUERY_CACHE
+    key = None
+    fingerprint = corpus.get("fingerprint")
+    if cache is not None and fingerprint is not None:
+        cache.track_corpus(pdf_dir, fingerprint)
+        key = query_cache_key(question, k, enable_rerank, fingerprint)
+        with span("query_cache"):
+            cached = cache.get(key)
+        if cached is not None:
+            return _copy_result(cached)
+
+    with span("hybrid_retrieval"):
+        raw_results = hybrid_retriever(
+            question,
+            corpus["vector_store"],
+            corpus["bm25_index"],
+            top_k=max(k * 5, 20),
+        )
 
     if enable_rerank:
-        import pandas as pd
-
-        rows = []
-        for cid, doc_id, text, score in raw_results:
-            rows.append({
-                "question_id": QUESTION_ID,
-                "question_text": question,
-                "chunk_id": cid,
-                "doc_id": doc_id,
-                "chunk_text": text,
-                "dense_score": score.get("dense_score"),
-                "sparse_score": score.get("sparse_score") or score.get("bm25_score"),
-            })
-
-        df = pd.DataFrame(rows)
-        df = rerank_candidates(df)
-        df = df.sort_values("rerank_rank").head(k)
-
-        chunks = [
-            RetrievedChunk(
-                chunk_id=int(r.chunk_id),
-                text=r.chunk_text,
-                score=float(r.S),
-                source=r.doc_id,
+        with span("rerank"):
+            order, S = rerank_single(
+                question,
+                [text for _, _, text, _ in raw_results],
+                [score.get("dense_score") for *_, score in raw_results],
+                [score.get("sparse_score") or score.get("bm25_score") for *_, score in raw_results],
+                chunk_ids=[cid for cid, *_ in raw_results],
+                chunk_features=corpus["chunk_features"],
             )
-            for r in df.itertuples()
-        ]
+
+        chunks = []
+        for i in order[:k]:
+            cid, doc_id, text, _ = raw_results[i]
+            chunks.append(RetrievedChunk(
+                chunk_id=int(cid),
+                text=text,
+                score=float(S[i]),
+                source=doc_id,
+            ))
 
     else:
         chunks = [
@@ -139,10 +103,42 @@ def retrieve_tool(
             for cid, doc_id, text, score in raw_results[:k]
         ]
 
-    return {
+    result = {
         "k": k,
         "mode": "hybrid",
         "reranked": enable_rerank,
         "candidate_pool_size": len(raw_results),
+        # Identifies the corpus build the chunk ids refer to (compact traces)
+        "corpus_fingerprint": corpus.get("fingerprint"),
         "chunks": [c.__dict__ for c in chunks],
     }
+    if key is not None:
+        cache.put(key, _copy_result(result))
+    return result
+
+
+def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Callers own what they get back (traces, compaction); the cache keeps its own copy
+    return {**result, "chunks": [dict(c) for c in result["chunks"]]}
+
+
+def set_query_cache(cache: QueryCache | None) -> None:
+    """Replace the retrieve_tool result cache (None disables caching)."""
+    global _QUERY_CACHE
+    _QUERY_CACHE = cache
+
+
+def query_cache_stats() -> Dict[str, Any] | None:
+    """Hit/miss counters of the retrieve_tool result cache (None when disabled)."""
+    return _QUERY_CACHE.snapshot_stats() if _QUERY_CACHE is not None else None
+
+
+def set_ingest_workers(workers: int) -> None:
+    """Ingest PDFs in `workers` processes when retrieve_tool has to build its corpus."""
+    global _INGEST_WORKERS
+    _INGEST_WORKERS = max(1, int(workers))
+
+
+def corpus_chunk_features(pdf_dir: str = DEFAULT_PDF_DIR) -> Dict[str, Any]:
+    """Index-time chunk features of the corpus `retrieve_tool` searches."""
+    return _load_corpus(pdf_dir=pdf_dir, chunking_strategy="fixed", workers=_INGEST_WORKERS)["chunk_features"]
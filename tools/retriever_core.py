@@ -1,29 +1,156 @@
 # tools/retriever_core.py
-import re
 import math
+import heapq
+from bisect import bisect_left
 import numpy as np
 from collections import Counter, defaultdict
 
+from tools.analyzer import analyze_chunks, tokenize
+
 # Function to embedd chunked text into vector
 # NOTE: This is a diagnostic embedding, not a semantic embedding
+EMBEDDING_SIZE = 128
+
 def get_embedding(chunk):
     # Dummy embedding function: convert each character to its ASCII value and create a fixed-size vector
-    embedding_size = 128
+    embedding_size = EMBEDDING_SIZE
     embedding = np.zeros(embedding_size)
     for i, char in enumerate(chunk):
         if i < embedding_size:
             embedding[i] = ord(char)
     return embedding
 
+def get_embeddings(texts, dtype=np.float64):
+    """
+    Same diagnostic embedding as get_embedding, written straight into one
+    (len(texts), EMBEDDING_SIZE) matrix.
+    """
+    matrix = np.zeros((len(texts), EMBEDDING_SIZE), dtype=dtype)
+    for row, text in enumerate(texts):
+        head = text[:EMBEDDING_SIZE]
+        if head:
+            codes = np.frombuffer(head.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+            matrix[row, :codes.shape[0]] = codes
+    return matrix
+
+
+# ------------------------
+# Dense store (matrix form)
+# ------------------------
+def _top_k_indices(scores, top_k):
+    """
+    Indices of the top_k highest scores, ordered exactly like a stable
+    descending sort (ties keep corpus order), using a partial selection.
+    """
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < n:
+        kth = np.partition(scores, n - top_k)[n - top_k]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:top_k]]
+
+
+def _is_contiguous(array, dtype):
+    return isinstance(array, np.ndarray) and array.dtype == dtype and array.flags["C_CONTIGUOUS"]
+
+
+class DenseStore:
+    """
+    Dense vector store holding every embedding in one contiguous matrix,
+    with inverse row norms precomputed.
+
+    A query is scored with a single matrix-vector product (a batch of
+    queries with one matrix-matrix product). Iterating the store still
+    yields the (chunk_id, doc_id, text, embedding) tuples of the original
+    list-based vector store.
+
+    The matrix is float64: embeddings are integer code points, so every dot
+    product is an exact integer sum and single-query and batched scores are
+    bit-identical regardless of BLAS summation order (float32 is not exact
+    once code points exceed ~4096).
+    """
+
+    dtype = np.float64
+
+    def __init__(self, chunk_ids, doc_ids, texts, matrix, inv_norms=None):
+        self.chunk_ids = list(chunk_ids)
+        self.doc_ids = list(doc_ids)
+        self.texts = list(texts)
+        # Already-contiguous float64 input (e.g. a memory-mapped snapshot) is not copied
+        self.matrix = np.asarray(matrix) if _is_contiguous(matrix, self.dtype) \
+            else np.ascontiguousarray(matrix, dtype=self.dtype)
+
+        if inv_norms is None:
+            norms = np.linalg.norm(self.matrix, axis=1)
+            inv_norms = np.zeros_like(norms)
+            np.divide(1.0, norms, out=inv_norms, where=norms > 0)
+        self.inv_norms = inv_norms
+
+    @classmethod
+    def from_tuples(cls, vector_store):
+        rows = list(vector_store)
+        matrix = (
+            np.stack([np.asarray(r[3], dtype=cls.dtype) for r in rows])
+            if rows else np.zeros((0, EMBEDDING_SIZE), dtype=cls.dtype)
+        )
+        return cls(
+            [r[0] for r in rows],
+            [r[1] for r in rows],
+            [r[2] for r in rows],
+            matrix,
+        )
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    def __iter__(self):
+        for i, chunk_id in enumerate(self.chunk_ids):
+            yield (chunk_id, self.doc_ids[i], self.texts[i], self.matrix[i])
+
+    def scores(self, query_embedding):
+        """Cosine similarity of one query embedding against every row."""
+        q = np.asarray(query_embedding, dtype=self.dtype)
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0 or len(self) == 0:
+            return np.zeros(len(self))
+        return (self.matrix @ q) * self.inv_norms / q_norm
+
+    def scores_batch(self, query_embeddings):
+        """(Q, N) cosine similarities for a (Q, EMBEDDING_SIZE) query matrix."""
+        Q = np.asarray(query_embeddings, dtype=self.dtype)
+        q_norms = np.linalg.norm(Q, axis=1)
+        sims = (Q @ self.matrix.T) * self.inv_norms / np.where(q_norms > 0, q_norms, 1.0)[:, None]
+        sims[q_norms == 0] = 0.0
+        return sims
+
+    def _results(self, sims, top_k):
+        return [
+            (self.chunk_ids[i], self.doc_ids[i], self.texts[i], float(sims[i]))
+            for i in _top_k_indices(sims, top_k)
+        ]
+
+    def search(self, query_embedding, top_k=4):
+        return self._results(self.scores(query_embedding), top_k)
+
+    def search_batch(self, query_embeddings, top_k=4, block_size=256):
+        """search() for every row of a query matrix, in blocks of block_size queries."""
+        out = []
+        for lo in range(0, len(query_embeddings), block_size):
+            sims = self.scores_batch(query_embeddings[lo:lo + block_size])
+            out.extend(self._results(row, top_k) for row in sims)
+        return out
+
+
 # Function to create a vector store from document chunks
 def create_vector_store(chunks):
-    vector_store = []
-    for id, chunk_info in chunks.items():
-        chunk_text = chunk_info["text"]
-        doc_id = chunk_info["doc_id"]
-        embedding = get_embedding(chunk_text)
-        vector_store.append((id, doc_id, chunk_text, embedding))
-    return vector_store
+    chunk_ids = list(chunks.keys())
+    texts = [chunks[cid]["text"] for cid in chunk_ids]
+    doc_ids = [chunks[cid]["doc_id"] for cid in chunk_ids]
+    return DenseStore(chunk_ids, doc_ids, texts, get_embeddings(texts))
 
 
 # Function to compute cosine similarity between two vectors
@@ -35,60 +162,67 @@ def cosine_similarity(vec1, vec2):
         return 0.0
     return dot_product / (norm_a * norm_b)
 
-# store embeddings in a list
+# Dense retrieval over the store (accepts legacy list-of-tuples stores too)
 def retrieve_similar_documents(vector_store, query, top_k=4):
-    query_embedding = get_embedding(query)
-    similarities = []
-
-    for chunk_id, doc_id, chunk_text, embedding in vector_store:
-        sim = cosine_similarity(query_embedding, embedding)
-        similarities.append((chunk_id, doc_id, chunk_text, sim))
-
-    similarities.sort(key=lambda x: x[3], reverse=True)
+    if not isinstance(vector_store, DenseStore):
+        vector_store = DenseStore.from_tuples(vector_store)
+    return vector_store.search(get_embeddings([query])[0], top_k=top_k)
 
-    return similarities[:top_k]
+def retrieve_similar_documents_batch(vector_store, queries, top_k=4):
+    if not isinstance(vector_store, DenseStore):
+        vector_store = DenseStore.from_tuples(vector_store)
+    return vector_store.search_batch(get_embeddings(list(queries)), top_k=top_k)
 
 # -------------
 # Sparse (BM25)
 # -------------
-_TOKEN_RE = re.compile(r"[a-z0-9]+")
-
-def tokenize(text: str):
-    # Deterministic, minimal tokenizer (no stemming)
-    return _TOKEN_RE.findall(text.lower())
 
 # BM25 Index Creation
-def create_bm25_index(chunks, k1=1.5, b=0.75):
+def create_bm25_index(chunks, k1=1.5, b=0.75, analyzed=None):
     """
     Returns a dict containing:
       - doc_len, avgdl
       - df, idf
-      - tf_per_doc (list of Counters)
-      - chunk_ids (list aligned with tf_per_doc)
+      - chunk_ids (document positions, aligned with doc_len)
+      - inverted index: term_ids (term -> term id) plus postings stored as
+        flat arrays: post_offsets (per term id), post_docs (document
+        positions), post_tf (term frequencies)
+      - len_norm: precomputed k1 * (1 - b + b * dl / avgdl) per document
+      - post_impact: BM25 contribution of each posting, and term_max_impact
+        (per term id upper bound) for dynamic pruning
       - meta mapping: chunk_id -> (doc_id, text)
       - params k1, b
-    """
-    chunk_ids = []
-    tf_per_doc = []
-    doc_len = []
-    df = defaultdict(int)
-
-    meta = {}
-    for chunk_id, info in chunks.items():
-        text = info["text"]
-        doc_id = info["doc_id"]
-        meta[chunk_id] = (doc_id, text)
-
-        toks = tokenize(text)
-        tf = Counter(toks)
-
-        chunk_ids.append(chunk_id)
-        tf_per_doc.append(tf)
-        doc_len.append(len(toks))
 
-        # document frequency
-        for term in tf.keys():
-            df[term] += 1
+    `analyzed` is the `analyze_chunks` output for `chunks` (computed here if
+    not given); term ids are its vocabulary ids.
+    """
+    if analyzed is None:
+        analyzed = analyze_chunks(chunks)
+
+    vocab = analyzed["vocab"]
+    chunk_ids = list(analyzed["chunk_ids"])
+    meta = {cid: (chunks[cid]["doc_id"], chunks[cid]["text"]) for cid in chunk_ids}
+
+    tok_offsets = analyzed["tok_offsets"]
+    lens = np.diff(tok_offsets)
+    doc_len = lens.tolist()
+    n_terms = len(vocab)
+
+    # Postings sorted by (term id, document position), tf = occurrences
+    stride = max(len(chunk_ids), 1)
+    pos_of_tok = np.repeat(np.arange(len(chunk_ids), dtype=np.int64), lens)
+    keys, counts = np.unique(
+        analyzed["tok_seq"].astype(np.int64) * stride + pos_of_tok, return_counts=True
+    )
+    post_terms = keys // stride
+    post_docs = (keys % stride).astype(np.int32)
+    post_tf = counts.astype(np.float64)
+
+    df_counts = np.bincount(post_terms, minlength=n_terms)
+    post_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    post_offsets[1:] = np.cumsum(df_counts)
+    df = dict(zip(vocab.tokens, df_counts.tolist()))
+    term_ids = vocab.token_ids
 
     N = len(chunk_ids)
     avgdl = (sum(doc_len) / N) if N else 0.0
@@ -99,59 +233,278 @@ def create_bm25_index(chunks, k1=1.5, b=0.75):
         # classic BM25 idf with +1 smoothing
         idf[term] = math.log(1 + (N - dfi + 0.5) / (dfi + 0.5))
 
+    # Per-document length normalisation (the query-independent part of the denominator)
+    norm_avgdl = avgdl if avgdl > 0 else 1.0
+    len_norm = np.array(
+        [k1 * (1 - b + b * ((dl if dl > 0 else 1) / norm_avgdl)) for dl in doc_len],
+        dtype=np.float64,
+    )
+
+    # Impact annotation: per-posting contribution and per-term upper bound
+    idf_by_tid = np.array([idf[term] for term in term_ids], dtype=np.float64)
+    post_idf = np.repeat(idf_by_tid, np.diff(post_offsets))
+    post_impact = post_idf * ((post_tf * (k1 + 1)) / (post_tf + len_norm[post_docs]))
+    term_max_impact = np.zeros(n_terms)
+    if post_impact.size:
+        term_max_impact = np.maximum.reduceat(post_impact, post_offsets[:-1])
+
     return {
         "k1": k1,
         "b": b,
         "N": N,
         "avgdl": avgdl,
         "chunk_ids": chunk_ids,
-        "tf_per_doc": tf_per_doc,
         "doc_len": doc_len,
+        "df": df,
         "idf": idf,
+        "term_ids": term_ids,
+        "post_offsets": post_offsets,
+        "post_docs": post_docs,
+        "post_tf": post_tf,
+        "post_impact": post_impact,
+        "term_max_impact": term_max_impact,
+        "len_norm": len_norm,
         "meta": meta
     }
 
 
+def term_postings(bm25_index, term):
+    """(document positions, term frequencies) for a term, or None if unseen."""
+    tid = bm25_index["term_ids"].get(term)
+    if tid is None:
+        return None
+    lo, hi = bm25_index["post_offsets"][tid], bm25_index["post_offsets"][tid + 1]
+    return bm25_index["post_docs"][lo:hi], bm25_index["post_tf"][lo:hi]
+
+
+def term_impacts(bm25_index, term):
+    """(document positions, BM25 contribution of `term` to each document)."""
+    tid = bm25_index["term_ids"].get(term)
+    if tid is None:
+        return None
+    lo, hi = bm25_index["post_offsets"][tid], bm25_index["post_offsets"][tid + 1]
+    return bm25_index["post_docs"][lo:hi], bm25_index["post_impact"][lo:hi]
+
+
+SPARSE_MODES = ("exhaustive", "maxscore")
+
 # Sparse Retriever (BM25)
-def sparse_retriever(query, bm25_index, top_k=50):
+def sparse_retriever(query, bm25_index, top_k=50, mode="exhaustive"):
+    """
+    BM25 over the postings of the query terms only.
+    Repeated query terms contribute once per occurrence.
+
+    mode:
+      - "exhaustive": term-at-a-time, every matching document is scored
+      - "maxscore":   document-at-a-time MaxScore; skips documents whose
+                      score upper bound cannot enter the current top_k.
+                      Returns exactly the same results as "exhaustive".
+    """
+    if mode not in SPARSE_MODES:
+        raise ValueError(f"Unknown sparse mode: {mode}")
+
     q_terms = tokenize(query)
     if not q_terms or bm25_index["N"] == 0:
         return []
 
-    k1 = bm25_index["k1"]
-    b = bm25_index["b"]
-    avgdl = bm25_index["avgdl"] if bm25_index["avgdl"] > 0 else 1.0
-    idf = bm25_index["idf"]
+    if mode == "maxscore":
+        return _maxscore_top_k(q_terms, bm25_index, top_k)
+
+    matched = [p for p in (term_impacts(bm25_index, t) for t in q_terms) if p is not None]
+    if not matched:
+        return []
 
-    scores = []
-    for i, chunk_id in enumerate(bm25_index["chunk_ids"]):
-        tf = bm25_index["tf_per_doc"][i]
-        dl = bm25_index["doc_len"][i] if bm25_index["doc_len"][i] > 0 else 1
+    candidates = np.unique(np.concatenate([docs for docs, _ in matched]))
+    scores = np.zeros(candidates.shape[0])
+    for docs, impacts in matched:
+        scores[np.searchsorted(candidates, docs)] += impacts
 
+    keep = scores > 0
+    candidates, scores = candidates[keep], scores[keep]
+
+    chunk_ids = bm25_index["chunk_ids"]
+    return [
+        (chunk_ids[candidates[i]], float(scores[i]))
+        for i in _top_k_indices(scores, top_k)
+    ]
+
+# Relative slack on pruning comparisons, so float rounding in the summed
+# upper bounds can never prune a document the exhaustive scorer would keep.
+_PRUNE_TOLERANCE = 1e-9
+
+def _maxscore_top_k(q_terms, bm25_index, top_k):
+    if top_k <= 0:
+        return []
+
+    counts = Counter(t for t in q_terms if t in bm25_index["term_ids"])
+    if not counts:
+        return []
+
+    # Query terms ordered by score upper bound (ascending)
+    terms = []
+    for term, count in counts.items():
+        tid = bm25_index["term_ids"][term]
+        docs, impacts = term_impacts(bm25_index, term)
+        ub = count * float(bm25_index["term_max_impact"][tid])
+        terms.append((ub, term, docs.tolist(), impacts.tolist()))
+    terms.sort(key=lambda t: (t[0], t[1]))
+
+    ubs = [t[0] for t in terms]
+    names = [t[1] for t in terms]
+    docs = [t[2] for t in terms]
+    impacts = [t[3] for t in terms]
+    cum_ub = list(np.cumsum(ubs))
+    m = len(terms)
+
+    ptr = [0] * m
+    heap = []                 # (score, -position): heap[0] is the current k-th best
+    theta = -math.inf         # score a new document must beat
+    pivot = 0                 # terms[pivot:] are essential
+
+    def below(bound):
+        return bound < theta - _PRUNE_TOLERANCE * max(1.0, abs(theta))
+
+    while pivot < m:
+        # Next candidate: smallest document among essential postings
+        d = min(
+            (docs[j][ptr[j]] for j in range(pivot, m) if ptr[j] < len(docs[j])),
+            default=None,
+        )
+        if d is None:
+            break
+
+        found = {}
+        partial = 0.0
+        for j in range(pivot, m):
+            p = ptr[j]
+            if p < len(docs[j]) and docs[j][p] == d:
+                found[names[j]] = impacts[j][p]
+                partial += counts[names[j]] * impacts[j][p]
+                ptr[j] = p + 1
+
+        # Non-essential terms, largest bound first, stop once d cannot qualify
+        pruned = False
+        for j in range(pivot - 1, -1, -1):
+            if below(partial + cum_ub[j]):
+                pruned = True
+                break
+            p = bisect_left(docs[j], d, ptr[j])
+            ptr[j] = p
+            if p < len(docs[j]) and docs[j][p] == d:
+                found[names[j]] = impacts[j][p]
+                partial += counts[names[j]] * impacts[j][p]
+        if pruned:
+            continue
+
+        # Exact score, accumulated in query order like the exhaustive scorer
         score = 0.0
         for term in q_terms:
-            if term not in tf:
-                continue
-            f = tf[term]
-            term_idf = idf.get(term, 0.0)
-            denom = f + k1 * (1 - b + b * (dl / avgdl))
-            score += term_idf * ((f * (k1 + 1)) / denom)
+            if term in found:
+                score += found[term]
+        if score <= 0:
+            continue
+
+        if len(heap) < top_k:
+            heapq.heappush(heap, (score, -d))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, -d))
+        else:
+            continue
 
-        if score > 0:
-            scores.append((chunk_id, float(score)))
+        if len(heap) == top_k:
+            theta = heap[0][0]
+            while pivot < m and below(cum_ub[pivot]):
+                pivot += 1
 
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores[:top_k]
+    chunk_ids = bm25_index["chunk_ids"]
+    ranked = sorted(heap, key=lambda x: (-x[0], -x[1]))
+    return [(chunk_ids[-neg_pos], float(score)) for score, neg_pos in ranked]
+
+
+def _ranked_from_scores(scores, bm25_index, top_k):
+    positions = np.flatnonzero(scores > 0)
+    chunk_ids = bm25_index["chunk_ids"]
+    return [
+        (chunk_ids[positions[i]], float(scores[positions[i]]))
+        for i in _top_k_indices(scores[positions], top_k)
+    ]
+
+
+# Sparse Retriever (BM25), many queries at once
+def sparse_retriever_batch(queries, bm25_index, top_k=50, mode="exhaustive", block_size=256):
+    """
+    sparse_retriever() for every query, returning identical per-query results.
+
+    Exhaustive mode scores a block of queries as one (Q, N) accumulation over
+    the shared postings: the product of the sparse query-term matrix with the
+    sparse term-document impact matrix. Each postings list is read once per
+    distinct (term, query position) in the block, and every query still
+    accumulates its terms in query order, so scores match bit for bit.
+    """
+    if mode not in SPARSE_MODES:
+        raise ValueError(f"Unknown sparse mode: {mode}")
+
+    token_lists = [tokenize(q) for q in queries]
+    if mode == "maxscore" or bm25_index["N"] == 0:
+        return [
+            _maxscore_top_k(toks, bm25_index, top_k) if toks and bm25_index["N"] else []
+            for toks in token_lists
+        ]
+
+    out = []
+    for lo in range(0, len(token_lists), block_size):
+        block = token_lists[lo:lo + block_size]
+        scores = np.zeros((len(block), bm25_index["N"]))
+
+        # Column j of the query-term matrix: which rows hold which term at position j
+        for j in range(max((len(t) for t in block), default=0)):
+            rows_by_term = defaultdict(list)
+            for row, toks in enumerate(block):
+                if j < len(toks):
+                    rows_by_term[toks[j]].append(row)
+
+            for term, rows in rows_by_term.items():
+                postings = term_impacts(bm25_index, term)
+                if postings is None:
+                    continue
+                docs, impacts = postings
+                scores[np.ix_(rows, docs)] += impacts
+
+        out.extend(_ranked_from_scores(row, bm25_index, top_k) for row in scores)
+
+    return out
 
 # ---------------------------------------
 # Hybrid merge — explicit + deterministic
 # ----------------------------------------
 def hybrid_retriever(query, vector_store, bm25_index,
                     top_k=4, dense_top_n=20, sparse_top_n=42,
-                    D=20, S=20):
+                    D=20, S=20, sparse_mode="exhaustive"):
     dense = retrieve_similar_documents(vector_store, query, top_k=dense_top_n)
-    sparse = sparse_retriever(query, bm25_index, top_k=sparse_top_n)
+    sparse = sparse_retriever(query, bm25_index, top_k=sparse_top_n, mode=sparse_mode)
+    return _merge_hybrid(dense, sparse, bm25_index, top_k=top_k, D=D, S=S)
+
+
+def hybrid_retriever_batch(queries, vector_store, bm25_index,
+                           top_k=4, dense_top_n=20, sparse_top_n=42,
+                           D=20, S=20, sparse_mode="exhaustive"):
+    """
+    hybrid_retriever() for a list of queries, returning one result list per
+    query, identical to the single-query path.
+
+    All queries are embedded at once and dense scoring is a (Q, N) matrix
+    product; BM25 is scored with sparse_retriever_batch.
+    """
+    queries = list(queries)
+    dense_all = retrieve_similar_documents_batch(vector_store, queries, top_k=dense_top_n)
+    sparse_all = sparse_retriever_batch(queries, bm25_index, top_k=sparse_top_n, mode=sparse_mode)
+    return [
+        _merge_hybrid(dense, sparse, bm25_index, top_k=top_k, D=D, S=S)
+        for dense, sparse in zip(dense_all, sparse_all)
+    ]
+
 
+def _merge_hybrid(dense, sparse, bm25_index, *, top_k, D, S):
     merged = {}
 
     # Dense annotate
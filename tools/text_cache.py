@@ -0,0 +1,192 @@
+# tools/text_cache.py
+"""
+Content-addressed disk cache for extracted PDF text.
+
+Entries hold the normalised per-page text produced by `iter_pdf_pages`
+(one JSON string per line, so they can be written and read as a stream),
+keyed by the sha256 of the PDF bytes plus the extraction version. A small
+stat index (path -> size, mtime_ns, sha256) lets unchanged files skip
+hashing. The cache is bounded by `max_bytes` and evicts least recently
+used entries (entry mtime is bumped on every hit).
+
+Writes go through a temporary file and `os.replace`, and index updates
+hold a file lock, so several processes can share one cache directory.
+The cache is an optimisation: if the directory cannot be written,
+extraction carries on without it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from utils.file_lock import file_lock
+
+TEXT_CACHE_DIR = os.path.join("artifacts", "text_cache")
+TEXT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_INDEX_FILE = "index.json"
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _atomic_write_json(path: str, obj) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class TextCache:
+    def __init__(self, cache_dir: str = TEXT_CACHE_DIR, max_bytes: int = TEXT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            pass  # reads miss and writes are skipped
+
+    # ---- keys ----
+    def _load_index(self) -> Dict[str, Dict[str, object]]:
+        try:
+            with open(os.path.join(self.cache_dir, _INDEX_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def content_hash(self, pdf_path: str) -> str:
+        """sha256 of the file, reusing the recorded hash while size+mtime are unchanged."""
+        path = os.path.abspath(pdf_path)
+        st = os.stat(path)
+        index = self._load_index()
+        rec = index.get(path)
+        if rec and rec.get("size") == st.st_size and rec.get("mtime_ns") == st.st_mtime_ns:
+            return rec["sha256"]
+
+        digest = _sha256(path)
+        index_path = os.path.join(self.cache_dir, _INDEX_FILE)
+        try:
+            with file_lock(index_path):
+                # Re-read under the lock: other processes may have added records
+                index = self._load_index()
+                index[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+                # Drop records of PDFs that no longer exist
+                index = {p: rec for p, rec in index.items() if os.path.exists(p)}
+                _atomic_write_json(index_path, index)
+        except OSError:
+            pass
+        return digest
+
+    def _entry_path(self, digest: str, version: int) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.v{version}.jsonl")
+
+    # ---- entries ----
+    def iter_pages(self, pdf_path: str, version: int) -> Optional[Iterator[str]]:
+        """Lazily read a cached entry, or None on a miss."""
+        entry = self._entry_path(self.content_hash(pdf_path), version)
+        try:
+            f = open(entry, "r", encoding="utf-8")
+        except OSError:
+            return None
+        try:
+            os.utime(entry)  # LRU recency
+        except OSError:
+            pass
+        return self._read_pages(f)
+
+    @staticmethod
+    def _read_pages(f) -> Iterator[str]:
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    def get(self, pdf_path: str, version: int) -> Optional[List[str]]:
+        pages = self.iter_pages(pdf_path, version)
+        return list(pages) if pages is not None else None
+
+    @contextmanager
+    def writer(self, pdf_path: str, version: int):
+        """
+        Yields write(page). The entry is committed only if the block exits
+        normally; an exception or an abandoned generator discards it. If the
+        entry cannot be written, write(page) does nothing and nothing is
+        committed.
+        """
+        entry = self._entry_path(self.content_hash(pdf_path), version)
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        try:
+            f = open(tmp, "w", encoding="utf-8")
+        except OSError:
+            yield lambda page: None
+            return
+
+        failed = []
+
+        def write(page: str) -> None:
+            if failed:
+                return
+            try:
+                f.write(json.dumps(page, ensure_ascii=False) + "\n")
+            except OSError:
+                failed.append(True)
+
+        try:
+            yield write
+        except BaseException:
+            try:
+                f.close()
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        try:
+            f.close()
+            if failed:
+                raise OSError("text cache entry was not fully written")
+            os.replace(tmp, entry)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._evict(keep=entry)
+
+    def put(self, pdf_path: str, version: int, pages: List[str]) -> None:
+        with self.writer(pdf_path, version) as write:
+            for page in pages:
+                write(page)
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".jsonl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+            total += st.st_size
+
+        # Oldest first; never evict the entry just written
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
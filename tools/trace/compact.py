@@ -0,0 +1,172 @@
+# tools/trace/compact.py
+"""
+Compact trace payloads: retrieved chunks by reference instead of by text.
+
+A compact trace keeps each retrieved chunk's id and score; the retrieve
+step's `corpus_fingerprint` says which corpus build the ids refer to.
+`resolve_trace` puts the text and source back from the chunk table of that
+build: the live snapshot, or, once a rebuild has replaced it, the table
+kept under <snapshot root>/retired/ (see tools/corpus_snapshot.py):
+
+    python -m tools.trace.compact logs/traces.jsonl > traces.resolved.jsonl
+
+Failure mode: chunks whose build has no chunk table left (snapshot root or
+retired tables deleted, or a build from before tables were retired)
+resolve to `"text": null, "source": null`. Check with
+`python -m experiments.trace_resolve_check`.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from tools.corpus_snapshot import SNAPSHOT_ROOT, read_manifest, retired_chunks_path
+
+TRACE_MODES = ("full", "compact")
+
+# Per-chunk fields dropped by compaction (restored from the chunk table)
+_RESOLVED_FIELDS = ("text", "source")
+
+
+# -------
+# Compact
+# -------
+
+def _compact_steps(steps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for step in steps:
+        result = step.get("tool_result")
+        if isinstance(result, dict) and "chunks" in result:
+            chunks = [
+                {k: v for k, v in c.items() if k not in _RESOLVED_FIELDS}
+                for c in result["chunks"]
+            ]
+            step = {**step, "tool_result": {**result, "chunks": chunks}}
+        out.append(step)
+    return out
+
+
+def compact_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of a runtime or memory trace with chunk text and source dropped
+    from every executor step (runtime: `execution`, memory: `executor.result`).
+    """
+    out = dict(trace)
+    if isinstance(out.get("execution"), list):
+        out["execution"] = _compact_steps(out["execution"])
+    executor = out.get("executor")
+    if isinstance(executor, dict) and isinstance(executor.get("result"), list):
+        out["executor"] = {**executor, "result": _compact_steps(executor["result"])}
+    out["trace_mode"] = "compact"
+    return out
+
+
+# -------
+# Resolve
+# -------
+
+class ChunkResolver:
+    """Chunk text and source by (corpus fingerprint, chunk id), read from corpus snapshots."""
+
+    def __init__(self, snapshot_root: str = SNAPSHOT_ROOT):
+        self.snapshot_root = snapshot_root
+        self._dirs: Optional[Dict[str, str]] = None
+        self._tables: Dict[str, Dict[int, Dict[str, str]]] = {}
+
+    def _snapshot_dirs(self) -> Dict[str, str]:
+        if self._dirs is None:
+            self._dirs = {}
+            if os.path.isdir(self.snapshot_root):
+                for name in sorted(os.listdir(self.snapshot_root)):
+                    manifest = read_manifest(os.path.join(self.snapshot_root, name))
+                    if manifest and manifest.get("fingerprint"):
+                        self._dirs[manifest["fingerprint"]] = os.path.join(self.snapshot_root, name)
+        return self._dirs
+
+    def _table_path(self, fingerprint: Optional[str]) -> Optional[str]:
+        path = self._snapshot_dirs().get(fingerprint)
+        if path is not None:
+            return os.path.join(path, "chunks.json")
+        if fingerprint:
+            return retired_chunks_path(self.snapshot_root, fingerprint)
+        return None
+
+    def table(self, fingerprint: Optional[str]) -> Dict[int, Dict[str, str]]:
+        if fingerprint not in self._tables:
+            table: Dict[int, Dict[str, str]] = {}
+            path = self._table_path(fingerprint)
+            if path is not None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    table = {
+                        cid: {"text": text, "source": doc_id}
+                        for cid, doc_id, text in zip(data["chunk_ids"], data["doc_ids"], data["texts"])
+                    }
+                except (OSError, ValueError, KeyError):
+                    table = {}
+            self._tables[fingerprint] = table
+        return self._tables[fingerprint]
+
+    def chunk(self, fingerprint: Optional[str], chunk_id: int) -> Optional[Dict[str, str]]:
+        return self.table(fingerprint).get(chunk_id)
+
+    def text(self, fingerprint: Optional[str], chunk_id: int) -> Optional[str]:
+        entry = self.chunk(fingerprint, chunk_id)
+        return entry["text"] if entry is not None else None
+
+
+def _resolve_chunk(chunk: Dict[str, Any], fingerprint: Optional[str], resolver: ChunkResolver) -> Dict[str, Any]:
+    missing = [k for k in _RESOLVED_FIELDS if k not in chunk]
+    if not missing:
+        return chunk
+    entry = resolver.chunk(fingerprint, chunk.get("chunk_id")) or {}
+    return {**chunk, **{k: entry.get(k) for k in missing}}
+
+
+def _resolve_steps(steps: List[Dict[str, Any]], resolver: ChunkResolver) -> List[Dict[str, Any]]:
+    out = []
+    for step in steps:
+        result = step.get("tool_result")
+        if isinstance(result, dict) and "chunks" in result:
+            fingerprint = result.get("corpus_fingerprint")
+            chunks = [_resolve_chunk(c, fingerprint, resolver) for c in result["chunks"]]
+            step = {**step, "tool_result": {**result, "chunks": chunks}}
+        out.append(step)
+    return out
+
+
+def resolve_trace(trace: Dict[str, Any], resolver: Optional[ChunkResolver] = None) -> Dict[str, Any]:
+    """Full-text copy of a compact trace (full traces are returned as-is)."""
+    if trace.get("trace_mode") != "compact":
+        return trace
+    resolver = resolver or ChunkResolver()
+    out = dict(trace)
+    if isinstance(out.get("execution"), list):
+        out["execution"] = _resolve_steps(out["execution"], resolver)
+    executor = out.get("executor")
+    if isinstance(executor, dict) and isinstance(executor.get("result"), list):
+        out["executor"] = {**executor, "result": _resolve_steps(executor["result"], resolver)}
+    out["trace_mode"] = "resolved"
+    return out
+
+
+def main(argv=None):
+    import argparse
+
+    from utils.logging_utils import LOG_PATH, iter_traces
+
+    parser = argparse.ArgumentParser(description="Print traces with chunk text resolved from corpus snapshots.")
+    parser.add_argument("path", nargs="?", default=LOG_PATH, help="trace log (rotated segments included)")
+    parser.add_argument("--snapshot-root", default=SNAPSHOT_ROOT)
+    args = parser.parse_args(argv)
+
+    resolver = ChunkResolver(args.snapshot_root)
+    for trace in iter_traces(args.path):
+        sys.stdout.write(json.dumps(resolve_trace(trace, resolver), ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# tools/trace/index.py
+"""
+Sidecar index over the runtime trace log, for offline querying.
+
+  logs/traces.index.jsonl   one entry per trace: segment id, byte offset and
+                            length of the trace line, plus key fields
+                            (ts_utc, question_id, decision, refusal_code,
+                            hedge_code, executor_decision, policy_mode)
+  logs/traces.index.json    state: indexed segments and how far each was
+                            read, the index size, per-hour aggregates
+
+`update()` only reads trace bytes appended since the last update, and
+follows rotation (utils/logging_utils.TraceSink): when the active file is
+rotated, its entries keep pointing at it under its new name. Offsets are
+positions in the uncompressed stream, so they stay valid after a segment
+is gzipped.
+
+    python -m tools.trace.index update
+    python -m tools.trace.index query --decision refuse --since 2026-10-17T09 --limit 5
+    python -m tools.trace.index aggregates
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.file_lock import file_lock
+from utils.logging_utils import LOG_PATH, trace_segments
+
+INDEX_VERSION = 1
+
+FIELDS = ("ts_utc", "question_id", "decision", "refusal_code", "hedge_code", "executor_decision", "policy_mode")
+
+# Per-hour counters kept in the aggregates
+COUNTED = ("decision", "refusal_code", "hedge_code", "executor_decision")
+
+
+def index_fields(trace: Dict[str, Any]) -> Dict[str, Any]:
+    gd = trace.get("generation_decision") or {}
+    steps = trace.get("execution")
+    ts = trace.get("ts_utc")
+    if steps is None:
+        executor_decision = None
+    else:
+        # Runtime semantics: the last executed step's action ("noop" if none)
+        executor_decision = steps[-1].get("action") if steps else "noop"
+    return {
+        "ts_utc": ts if isinstance(ts, (int, float)) else None,
+        "question_id": trace.get("question_id"),
+        "decision": gd.get("decision"),
+        "refusal_code": gd.get("refusal_code"),
+        "hedge_code": gd.get("hedge_code"),
+        "executor_decision": executor_decision,
+        "policy_mode": trace.get("policy_mode"),
+    }
+
+
+def hour_bucket(ts: Optional[float]) -> str:
+    return time.strftime("%Y-%m-%dT%H", time.gmtime(ts)) if ts is not None else "unknown"
+
+
+def _open_segment(path: str):
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path += ".gz"
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _base(path: str) -> str:
+    return path[:-3] if path.endswith(".gz") else path
+
+
+# -----------
+# Trace index
+# -----------
+
+class TraceIndex:
+    def __init__(self, log_path: str = LOG_PATH, index_path: Optional[str] = None):
+        self.log_path = log_path
+        self.index_path = index_path or os.path.splitext(log_path)[0] + ".index.jsonl"
+        self.state_path = os.path.splitext(self.index_path)[0] + ".json"
+        self._state: Optional[Dict[str, Any]] = None
+
+    # ---- State ----
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == INDEX_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        # No (usable) state: rebuild the index from scratch
+        return {"version": INDEX_VERSION, "segments": [], "active": None, "index_bytes": 0, "hours": {}}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp = f"{self.state_path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.state_path)
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        if self._state is None:
+            self._state = self._load_state()
+        return self._state
+
+    # ---- Indexing ----
+    def update(self) -> int:
+        """Index traces appended since the last update; returns how many."""
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        with file_lock(self.index_path):
+            state = self._load_state()
+            self._truncate_index(state["index_bytes"])
+            segments = state["segments"]
+            for seg in segments:
+                if seg["path"] and not os.path.exists(seg["path"]) and os.path.exists(seg["path"] + ".gz"):
+                    seg["path"] += ".gz"
+
+            known = {_base(seg["path"]) for seg in segments if seg["path"]}
+            found = trace_segments(self.log_path)
+            unknown = [p for p in found if p != self.log_path and _base(p) not in known]
+            try:
+                st = os.stat(self.log_path)
+            except FileNotFoundError:
+                st = None
+
+            entries: List[Dict[str, Any]] = []
+            if state["active"] is not None:
+                active = segments[state["active"]]
+                # Once indexed, any new rotated segment came from the active file
+                rotated = st is None or st.st_ino != active["ino"] or st.st_size < active["indexed"] or unknown
+                if rotated:
+                    active["path"] = unknown.pop(0) if unknown else None
+                    if active["path"]:
+                        self._index_segment(state, state["active"], entries, complete=True)
+                    state["active"] = None
+
+            for path in unknown:
+                segments.append({"path": path, "ino": None, "indexed": 0})
+                self._index_segment(state, len(segments) - 1, entries, complete=True)
+
+            if st is not None:
+                if state["active"] is None:
+                    segments.append({"path": self.log_path, "ino": st.st_ino, "indexed": 0})
+                    state["active"] = len(segments) - 1
+                self._index_segment(state, state["active"], entries, complete=False)
+
+            if entries:
+                data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries).encode("utf-8")
+                with open(self.index_path, "ab") as f:
+                    f.write(data)
+                state["index_bytes"] += len(data)
+            self._save_state(state)
+            self._state = state
+        return len(entries)
+
+    def _truncate_index(self, size: int) -> None:
+        # Entries past the recorded size were written by an update that died
+        # before saving its state; they will be re-indexed
+        try:
+            if os.path.getsize(self.index_path) != size:
+                with open(self.index_path, "ab") as f:
+                    f.truncate(size)
+        except FileNotFoundError:
+            pass
+
+    def _index_segment(self, state: Dict[str, Any], sid: int, out: List[Dict[str, Any]], complete: bool) -> None:
+        seg = state["segments"][sid]
+        off = seg["indexed"]
+        with _open_segment(seg["path"]) as f:
+            f.seek(off)
+            for line in f:
+                if not line.endswith(b"\n") and not complete:
+                    break  # still being written
+                start, off = off, off + len(line)
+                try:
+                    trace = json.loads(line)
+                except ValueError:
+                    continue  # blank or torn line
+                fields = index_fields(trace)
+                out.append({"sid": sid, "off": start, "len": len(line), **fields})
+                self._count(state["hours"], fields)
+        seg["indexed"] = off
+
+    @staticmethod
+    def _count(hours: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        bucket = hours.setdefault(hour_bucket(fields["ts_utc"]), {"traces": 0, "policy_enforced": 0})
+        bucket["traces"] += 1
+        bucket["policy_enforced"] += fields["policy_mode"] is True
+        for name in COUNTED:
+            value = fields[name]
+            if value is not None:
+                counts = bucket.setdefault(name, {})
+                counts[value] = counts.get(value, 0) + 1
+
+    # ---- Querying ----
+    def entries(
+        self,
+        *,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        **equals: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Index entries matching every `field=value` filter (see FIELDS) and
+        since <= ts_utc < until. Only the index is read.
+        """
+        unknown = set(equals) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown index fields: {sorted(unknown)}")
+        size = self.state["index_bytes"]
+        if not size:
+            return
+        with open(self.index_path, "rb") as f:
+            for line in f.read(size).splitlines():
+                e = json.loads(line)
+                if any(e.get(k) != v for k, v in equals.items()):
+                    continue
+                ts = e.get("ts_utc")
+                if since is not None and (ts is None or ts < since):
+                    continue
+                if until is not None and (ts is None or ts >= until):
+                    continue
+                yield e
+
+    def fetch(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The trace an entry points at (None if its segment was deleted)."""
+        path = self.state["segments"][entry["sid"]]["path"]
+        if not path:
+            return None
+        try:
+            with _open_segment(path) as f:
+                f.seek(entry["off"])
+                return json.loads(f.read(entry["len"]))
+        except (OSError, ValueError):
+            return None
+
+    def query(self, *, limit: Optional[int] = None, **filters: Any) -> Iterator[Dict[str, Any]]:
+        n = 0
+        for entry in self.entries(**filters):
+            if limit is not None and n >= limit:
+                return
+            trace = self.fetch(entry)
+            if trace is not None:
+                n += 1
+                yield trace
+
+    # ---- Aggregates ----
+    def aggregates(self) -> List[Dict[str, Any]]:
+        """Decision mix and refusal/hedge rates per UTC hour (from the state, no scan)."""
+        rows = []
+        for hour in sorted(self.state["hours"]):
+            b = self.state["hours"][hour]
+            decisions = b.get("decision", {})
+            n = b["traces"]
+            rows.append({
+                "hour": hour,
+                "traces": n,
+                "decisions": decisions,
+                "refusal_rate": decisions.get("refuse", 0) / n,
+                "hedge_rate": decisions.get("hedge", 0) / n,
+                "refusal_codes": b.get("refusal_code", {}),
+                "hedge_codes": b.get("hedge_code", {}),
+                "executor_decisions": b.get("executor_decision", {}),
+                "policy_enforced": b["policy_enforced"],
+            })
+        return rows
+
+
+# ---
+# CLI
+# ---
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds, or an ISO time (UTC unless it has an offset)."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    from datetime import datetime, timezone
+
+    if len(value) == 13:  # 2026-10-17T09
+        value += ":00"
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index, query and aggregate runtime traces.")
+    parser.add_argument("--log", default=LOG_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("update", help="index newly appended traces")
+    q = sub.add_parser("query", help="print matching traces (JSONL)")
+    for name in FIELDS[1:]:
+        q.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    q.add_argument("--since", help="epoch seconds or ISO time (UTC)")
+    q.add_argument("--until", help="epoch seconds or ISO time (UTC)")
+    q.add_argument("--limit", type=int, default=None)
+    q.add_argument("--entries", action="store_true", help="print index entries instead of traces")
+    sub.add_parser("aggregates", help="print per-hour aggregates (JSONL)")
+    args = parser.parse_args(argv)
+
+    index = TraceIndex(args.log)
+    n_new = index.update()
+    if args.command == "update":
+        print(f"Indexed {n_new} new traces", file=sys.stderr)
+        return
+
+    if args.command == "aggregates":
+        rows = index.aggregates()
+    else:
+        equals = {name: getattr(args, name) for name in FIELDS[1:] if getattr(args, name) is not None}
+        if "question_id" in equals:
+            # Ids are logged as given: 42 and "42" are different ids
+            try:
+                equals["question_id"] = json.loads(equals["question_id"])
+            except ValueError:
+                pass
+        if "policy_mode" in equals:
+            equals["policy_mode"] = equals["policy_mode"].strip().lower() in {"1", "true", "yes", "y"}
+        filters = dict(equals, since=_parse_time(args.since), until=_parse_time(args.until))
+        if args.entries:
+            rows = list(index.entries(**filters))[: args.limit]
+        else:
+            rows = index.query(limit=args.limit, **filters)
+    for row in rows:
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional
 
 from memory.router import MemoryRouter
 from memory.working import WorkingMemory
+from tools.trace.compact import compact_trace
 
 from planner.planner import Planner
 from executor.executor import Executor
@@ -38,6 +39,8 @@ def traced_memory_run(
     semantic_keys: Optional[List[str]] = None,
     # if you want to seed memory for a particular run
     seed_semantic: Optional[Dict[str, Any]] = None,
+    # drop chunk text from the executor result (see tools/trace/compact.py)
+    compact: bool = False,
 ) -> Dict[str, Any]:
     trace_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -78,6 +81,7 @@ def traced_memory_run(
     )
 
     result = executor.execute(plan, wm=wm)
+    mem.flush()
 
     # --- events written during this run ---
     after_events = _read_jsonl_tail(events_file, n=10_000)
@@ -118,5 +122,8 @@ def traced_memory_run(
         "memory_events": run_events,
     }
 
+    if compact:
+        trace = compact_trace(trace)
+
     trace_path.write_text(json.dumps(trace, indent=2, ensure_ascii=False), encoding="utf-8")
     return trace
@@ -42,6 +42,7 @@ def traced_policy_plan(
         wm=wm,
         memory_signal=memory_signal,
     )
+    mem.flush()
 
     trace = {
         "timestamp": time.time(),
@@ -1,24 +1,9 @@
 # tools/retriever_trace.py
 import json
 from datetime import datetime
-from tools.retriever_core import hybrid_retriever
-
-def traced_hybrid_retriever(
-    *,
-    query,
-    vector_store,
-    bm25_index,
-    top_k,
-    trace_path,
-    metadata=None
-):
-    results = hybrid_retriever(
-        query=query,
-        vector_store=vector_store,
-        bm25_index=bm25_index,
-        top_k=top_k
-    )
+from tools.retriever_core import hybrid_retriever, hybrid_retriever_batch
 
+def _write_retrieval_trace(*, query, top_k, results, trace_path, metadata=None):
     trace = {
         "timestamp": datetime.utcnow().isoformat(),
         "query": query,
@@ -42,4 +27,62 @@ def traced_hybrid_retriever(
     with open(trace_path, "w") as f:
         json.dump(trace, f, indent=2)
 
+def traced_hybrid_retriever(
+    *,
+    query,
+    vector_store,
+    bm25_index,
+    top_k,
+    trace_path,
+    metadata=None
+):
+    results = hybrid_retriever(
+        query=query,
+        vector_store=vector_store,
+        bm25_index=bm25_index,
+        top_k=top_k
+    )
+
+    _write_retrieval_trace(
+        query=query,
+        top_k=top_k,
+        results=results,
+        trace_path=trace_path,
+        metadata=metadata,
+    )
+
     return results
+
+def traced_hybrid_retriever_batch(
+    *,
+    queries,
+    vector_store,
+    bm25_index,
+    top_k,
+    trace_paths,
+    metadata=None
+):
+    """
+    Batched traced_hybrid_retriever: one trace file per query, same content
+    as the single-query wrapper.
+    """
+    queries = list(queries)
+    metadata = metadata or [None] * len(queries)
+
+    all_results = hybrid_retriever_batch(
+        queries,
+        vector_store,
+        bm25_index,
+        top_k=top_k
+    )
+
+    for query, results, trace_path, meta in zip(queries, all_results, trace_paths, metadata):
+        _write_retrieval_trace(
+            query=query,
+            top_k=top_k,
+            results=results,
+            trace_path=trace_path,
+            metadata=meta,
+        )
+
+    return all_results
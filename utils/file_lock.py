@@ -0,0 +1,60 @@
+# utils/file_lock.py
+"""
+Cross-process advisory file locks (fcntl on POSIX, msvcrt on Windows).
+
+The lock is taken on a sidecar `<path>.lock` file, so it also guards
+files that are replaced atomically (os.replace swaps the inode).
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            # LK_LOCK itself retries for ~10s before giving up
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(0.01)
+
+
+def _unlock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on `path` for the duration of the block."""
+    lock_path = f"{path}.lock"
+    lock_dir = os.path.dirname(lock_path)
+    if lock_dir:
+        os.makedirs(lock_dir, exist_ok=True)
+    with open(lock_path, "a+") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def locked_append(path: str, text: str) -> None:
+    """Append `text` to `path` as one unit with respect to other lockers."""
+    with file_lock(path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
@@ -1,13 +1,284 @@
 # utils/logging_utils.py
+"""
+Runtime trace log (logs/traces.jsonl).
+
+`write_trace` serialises the event (an unserialisable event raises, on the
+caller) and hands the line to a background TraceSink: a bounded queue
+drained by one writer thread, which appends lines in batches (one locked
+append per batch, so batch workers can share the log).
+
+The active file is rotated once it reaches `max_bytes` or, if set,
+`max_age_s` (age as observed by this process). Rotated segments are named
+traces-<UTC time>.jsonl next to it and can be gzip-compressed by the
+writer. `iter_traces` reads the rotated segments and the active file in
+order.
+
+When the queue is full, `on_full` decides what happens to the event:
+  "block"  wait up to `block_timeout_s` for room, then write it on the
+           caller's thread (default: back-pressure never loses a trace)
+  "sync"   write it on the caller's thread right away
+  "drop"   count it in `stats["dropped"]`; the request never waits
+
+Traces the sink dropped or failed to write are reported on stderr when it
+closes.
+"""
+import atexit
+import glob
+import gzip
 import json
 import os
-from typing import Any, Dict
+import queue
+import shutil
+import sys
+import threading
+import time
+from multiprocessing import util as mp_util
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.file_lock import file_lock
 
 LOG_PATH = os.path.join("logs", "traces.jsonl")
 
+ON_FULL = ("block", "sync", "drop")
+
+_STOP = object()
+
+
+# ----------
+# Trace sink
+# ----------
+
+class TraceSink:
+    def __init__(
+        self,
+        path: str = LOG_PATH,
+        *,
+        background: bool = True,
+        max_queue: int = 1024,
+        batch_size: int = 64,
+        flush_interval_s: float = 0.5,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age_s: Optional[float] = None,
+        compress: bool = False,
+        on_full: str = "block",
+        block_timeout_s: float = 0.05,
+    ):
+        if on_full not in ON_FULL:
+            raise ValueError(f"on_full must be one of {ON_FULL}, got {on_full!r}")
+        self.path = path
+        self.background = background
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.compress = compress
+        self.on_full = on_full
+        self.block_timeout_s = block_timeout_s
+
+        self.stats = {"submitted": 0, "written": 0, "dropped": 0, "errors": 0, "batches": 0, "rotations": 0}
+        self._lock = threading.Lock()        # thread start + caller-side counters
+        self._write_lock = threading.Lock()  # writer thread vs "sync" writes
+        self._segment_inode: Optional[int] = None
+        self._segment_started = 0.0
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+
+    # ---- Caller side ----
+    def submit(self, event: Dict[str, Any]) -> None:
+        # Serialised here, so a bad event raises at its caller (and later
+        # mutations of the event do not leak into the log)
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.stats["submitted"] += 1
+        if not self.background or self._closed:
+            self._write_batch([line])
+            return
+
+        q = self._ensure_started()
+        try:
+            if self.on_full == "block":
+                q.put(line, timeout=self.block_timeout_s)
+            else:
+                q.put_nowait(line)
+        except queue.Full:
+            if self.on_full == "drop":
+                with self._lock:
+                    self.stats["dropped"] += 1
+                return
+            self._write_batch([line])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything submitted so far is on disk."""
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Flush and stop the writer thread; later events are written synchronously."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self.stats["dropped"] or self.stats["errors"]:
+            print(
+                f"trace sink {self.path}: {self.stats['dropped']} traces dropped (queue full), "
+                f"{self.stats['errors']} failed to write",
+                file=sys.stderr,
+            )
+
+    def _ensure_started(self) -> queue.Queue:
+        # Forked children (batch workers) inherit the object but not the thread
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.max_queue)
+                self._thread = threading.Thread(target=self._run, name="trace-sink", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.close)
+                # Pool workers leave through multiprocessing's exit path, not atexit
+                mp_util.Finalize(self, self.close, exitpriority=100)
+        return self._queue
+
+    # ---- Writer thread ----
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            item = q.get()
+            batch: List[str] = []
+            markers: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval_s
+            # Gather up to batch_size events, or whatever arrives within flush_interval_s
+            while True:
+                if item is _STOP:
+                    self._write_safely(batch)
+                    for m in markers:
+                        m.set()
+                    return
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+            self._write_safely(batch)
+            for m in markers:
+                m.set()
+
+    def _write_safely(self, batch: List[str]) -> None:
+        # A failing disk must not kill the writer (and strand flush() waiters)
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            self.stats["errors"] += len(batch)
+            print(f"trace sink {self.path}: failed to write {len(batch)} traces: {e!r}", file=sys.stderr)
+
+    def _write_batch(self, lines: List[str]) -> None:
+        if not lines:
+            return
+
+        rotated = None
+        with self._write_lock:
+            log_dir = os.path.dirname(self.path)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            # Locked: batch workers append to (and rotate) the same log
+            with file_lock(self.path):
+                rotated = self._maybe_rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                if self._segment_inode is None:
+                    # This write started a new segment: its age counts from now
+                    self._segment_inode = os.stat(self.path).st_ino
+                    self._segment_started = time.time()
+            self.stats["written"] += len(lines)
+            self.stats["batches"] += 1
+        if rotated is not None and self.compress:
+            try:
+                _compress(rotated)
+            except OSError:
+                pass  # the segment stays readable uncompressed
+
+    # ---- Rotation (caller holds the file lock) ----
+    def _maybe_rotate(self) -> Optional[str]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._segment_inode = None
+            return None
+        now = time.time()
+        if st.st_ino != self._segment_inode:
+            self._segment_inode = st.st_ino
+            self._segment_started = now
 
-def _ensure_logs_dir() -> None:
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+        too_big = st.st_size >= self.max_bytes
+        too_old = self.max_age_s is not None and now - self._segment_started >= self.max_age_s
+        if st.st_size == 0 or not (too_big or too_old):
+            return None
+
+        rotated = _segment_path(self.path, now)
+        os.replace(self.path, rotated)
+        self._segment_inode = None
+        self.stats["rotations"] += 1
+        return rotated
+
+
+def _segment_path(path: str, ts: float) -> str:
+    stem, ext = os.path.splitext(path)
+    us = int(ts * 1e6)
+    while True:
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(us // 1_000_000)) + f"{us % 1_000_000:06d}Z"
+        out = f"{stem}-{stamp}{ext}"
+        if not (os.path.exists(out) or os.path.exists(out + ".gz")):
+            return out
+        us += 1
+
+
+def _compress(path: str) -> None:
+    tmp = f"{path}.gz.tmp-{os.getpid()}"
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, f"{path}.gz")
+    os.remove(path)
+
+
+# ------------
+# Default sink
+# ------------
+
+_SINK: Optional[TraceSink] = None
+_SINK_LOCK = threading.Lock()
+
+
+def get_trace_sink() -> TraceSink:
+    global _SINK
+    if _SINK is None:
+        with _SINK_LOCK:
+            if _SINK is None:
+                _SINK = TraceSink()
+    return _SINK
+
+
+def set_trace_sink(sink: TraceSink) -> None:
+    """Install `sink` as the target of `write_trace` (the previous one is closed)."""
+    global _SINK
+    with _SINK_LOCK:
+        old, _SINK = _SINK, sink
+    if old is not None and old is not sink:
+        old.close()
 
 
 def write_trace(event: Dict[str, Any]) -> None:
@@ -19,6 +290,42 @@ def write_trace(event: Dict[str, Any]) -> None:
     - no interpretation
     - no formatting logic
     """
-    _ensure_logs_dir()
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+    get_trace_sink().submit(event)
+
+
+def flush_traces(timeout: Optional[float] = None) -> bool:
+    return get_trace_sink().flush(timeout) if _SINK is not None else True
+
+
+# -------
+# Reading
+# -------
+
+def trace_segments(path: str = LOG_PATH) -> List[str]:
+    """Rotated segments (oldest first, .gz preferred) followed by the active file."""
+    stem, ext = os.path.splitext(path)
+    pattern = glob.escape(stem) + "-*" + ext
+    segments: Dict[str, str] = {}
+    for p in glob.glob(pattern) + glob.glob(pattern + ".gz"):
+        key = p[:-3] if p.endswith(".gz") else p
+        if key not in segments or p.endswith(".gz"):
+            segments[key] = p
+    out = [segments[k] for k in sorted(segments)]
+    if os.path.exists(path):
+        out.append(path)
+    return out
+
+
+def iter_traces(path: str = LOG_PATH) -> Iterator[Dict[str, Any]]:
+    """Every trace in the log, rotated segments included; torn lines are skipped."""
+    for seg in trace_segments(path):
+        opener = gzip.open if seg.endswith(".gz") else open
+        with opener(seg, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,120 @@
+# utils/profiling.py
+"""
+Opt-in CPU + allocation profiling.
+
+    with profile("q0042"):            # writes logs/profiles/q0042.{prof,txt}
+        runtime.run(question)
+
+  <name>.prof   cProfile stats (pstats / snakeviz)
+  <name>.txt    top functions by cumulative time, plus the allocation
+                sites that grew the most during the block (tracemalloc)
+                and the traced peak
+
+Profiling a whole script (e.g. a probe, including its corpus build):
+
+    python -m utils.profiling experiments/retrieval_probe.py [args...]
+
+Blocks do not nest: while one profile is active, inner `profile()` calls
+are no-ops, so an outer script profile is never clobbered.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILE_DIR = os.path.join("logs", "profiles")
+TOP_N = 40
+TRACEMALLOC_FRAMES = 10
+
+_active = False
+
+
+def safe_name(name) -> str:
+    """File-name-safe version of a question id / label."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)).strip("_") or "profile"
+
+
+def _write_summary(path: str, name: str, prof: cProfile.Profile, growth, peak: int) -> None:
+    buf = io.StringIO()
+    stats = pstats.Stats(prof, stream=buf)
+    stats.sort_stats("cumulative").print_stats(TOP_N)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# profile: {name}\n\n")
+        f.write(f"## CPU (top {TOP_N} by cumulative time)\n")
+        f.write(buf.getvalue())
+        f.write(f"\n## Allocations (top {TOP_N} by growth, traced peak {peak / 1024:.1f} KiB)\n")
+        for stat in growth[:TOP_N]:
+            f.write(f"{stat}\n")
+
+
+@contextmanager
+def profile(name, out_dir: str = PROFILE_DIR, enabled: bool = True):
+    """
+    Profile the block; yields {"prof": path, "summary": path} (None when
+    disabled or nested inside another profile).
+    """
+    global _active
+    if not enabled or _active:
+        yield None
+        return
+
+    _active = True
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, safe_name(name))
+    paths: Dict[str, str] = {"prof": f"{base}.prof", "summary": f"{base}.txt"}
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield paths
+    finally:
+        prof.disable()
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        _active = False
+
+        prof.dump_stats(paths["prof"])
+        _write_summary(paths["summary"], str(name), prof, after.compare_to(before, "lineno"), peak)
+
+
+def should_profile(run_number: int, every: int) -> bool:
+    """Every `every`-th run (1-based); 0 disables."""
+    return every > 0 and run_number % every == 0
+
+
+def main(argv: Optional[list] = None) -> None:
+    import argparse
+    import runpy
+
+    parser = argparse.ArgumentParser(description="Run a Python script under cProfile + tracemalloc.")
+    parser.add_argument("--out-dir", default=PROFILE_DIR)
+    parser.add_argument("--name", default=None, help="artifact name (default: script name)")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    name = args.name or os.path.splitext(os.path.basename(args.script))[0]
+    sys.argv = [args.script, *args.args]
+    with profile(name, out_dir=args.out_dir) as paths:
+        runpy.run_path(args.script, run_name="__main__")
+    print(f"Profile written to {paths['prof']} and {paths['summary']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# utils/timing.py
+"""
+Lightweight nested timing spans.
+
+    with record("run") as timings:        # starts a span tree for this context
+        with span("planner"):
+            ...
+    trace["timings"] = timings.to_dict()
+
+`span()` outside a `record()` block returns a shared null context, so
+instrumented code costs one ContextVar lookup when timing is off. The
+current span lives in a ContextVar, so concurrent threads/tasks each get
+their own tree.
+
+Each span records wall time (perf_counter) and CPU time of the calling
+thread (thread_time), in milliseconds.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+_CURRENT: ContextVar[Optional["Span"]] = ContextVar("timing_span", default=None)
+_NULL = nullcontext()
+
+
+class Span:
+    __slots__ = ("name", "wall_ms", "cpu_ms", "children", "_t0", "_c0", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.children: List[Span] = []
+
+    def __enter__(self) -> "Span":
+        self._token = _CURRENT.set(self)
+        self._t0 = time.perf_counter()
+        self._c0 = time.thread_time()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.wall_ms = (time.perf_counter() - self._t0) * 1000.0
+        self.cpu_ms = (time.thread_time() - self._c0) * 1000.0
+        _CURRENT.reset(self._token)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "wall_ms": round(self.wall_ms, 3),
+            "cpu_ms": round(self.cpu_ms, 3),
+        }
+        if self.children:
+            out["children"] = [c.to_dict() for c in self.children]
+        return out
+
+
+def span(name: str):
+    """Time a block as a child of the current span (no-op when not recording)."""
+    parent = _CURRENT.get()
+    if parent is None:
+        return _NULL
+    child = Span(name)
+    parent.children.append(child)
+    return child
+
+
+@contextmanager
+def record(name: str = "run", enabled: bool = True):
+    """Root of a span tree; yields the root Span (None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    with Span(name) as root:
+        yield root
+
+
+# -----------
+# Aggregation
+# -----------
+
+def _walk(node: Dict[str, Any], prefix: str = ""):
+    path = f"{prefix}/{node['name']}" if prefix else node["name"]
+    yield path, node
+    for child in node.get("children", ()):
+        yield from _walk(child, path)
+
+
+def aggregate_timings(traces: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Per-stage latency breakdown over traces that carry a `timings` tree.
+    Stages are keyed by their span path ("run/executor/retrieve/rerank");
+    repeated spans within one trace are summed first.
+    """
+    per_stage: Dict[str, Dict[str, List[float]]] = {}
+    n_traces = 0
+    for trace in traces:
+        root = trace.get("timings")
+        if not root:
+            continue
+        n_traces += 1
+        totals: Dict[str, List[float]] = {}
+        for path, node in _walk(root):
+            wall_cpu = totals.setdefault(path, [0.0, 0.0])
+            wall_cpu[0] += node["wall_ms"]
+            wall_cpu[1] += node["cpu_ms"]
+        for path, (wall, cpu) in totals.items():
+            stage = per_stage.setdefault(path, {"wall": [], "cpu": []})
+            stage["wall"].append(wall)
+            stage["cpu"].append(cpu)
+
+    # Tree order: children after their parent, siblings in first-seen order
+    first_seen = {path: i for i, path in enumerate(per_stage)}
+
+    def tree_key(path: str):
+        parts = path.split("/")
+        return tuple(first_seen["/".join(parts[:i + 1])] for i in range(len(parts)))
+
+    run_total = sum(sum(s["wall"]) for p, s in per_stage.items() if "/" not in p) or 1.0
+    out: Dict[str, Dict[str, float]] = {}
+    for path in sorted(per_stage, key=tree_key):
+        stage = per_stage[path]
+        wall = np.asarray(stage["wall"])
+        p50, p95 = np.percentile(wall, [50, 95])
+        out[path] = {
+            "count": int(wall.size),
+            "traces": n_traces,
+            "mean_ms": float(wall.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "cpu_mean_ms": float(np.mean(stage["cpu"])),
+            "share": float(wall.sum() / run_total),
+        }
+    return out